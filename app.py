@@ -1,5 +1,13 @@
 import streamlit as st
+from utils.arranque import precalentar
 from utils.login import generarLogin, logout
+from utils.metricas import ADMINISTRADORES, iniciar_servidor_metricas, iniciar_traza, resumen_traza
+
+# Endpoint de Prometheus (una vez por proceso) y traza de tiempos de esta
+# ejecución; la de la ejecución anterior queda para el panel de depuración
+iniciar_servidor_metricas()
+st.session_state['traza_anterior'] = st.session_state.get('traza_actual', [])
+st.session_state['traza_actual'] = iniciar_traza()
 
 # Mostrar login y detener si no está autenticado
 generarLogin()
@@ -7,6 +15,9 @@ generarLogin()
 # ✅ Solo si el usuario está logueado
 if st.session_state.get("authenticated", False):
 
+    # Importar en segundo plano lo que necesitan las páginas (gráficos y datos)
+    precalentar()
+
     # --- SIDEBAR personalizado --- Solo aparece si el usuario está logueado
     with st.sidebar:
         st.markdown("## ⚽ App-Fútbol")
@@ -24,6 +35,12 @@ if st.session_state.get("authenticated", False):
         if st.button("🔓 Cerrar sesión"):
             logout()  # Llamada al logout cuando se presiona el botón
 
+        # Panel de depuración: desglose de tiempos de la ejecución anterior
+        if st.session_state.get('usuario') in ADMINISTRADORES and st.checkbox("🛠️ Panel de depuración"):
+            traza = st.session_state['traza_anterior']
+            st.caption(f"Ejecución anterior: {len(traza)} tramos medidos")
+            st.dataframe(resumen_traza(traza), hide_index=True, use_container_width=True)
+
 
     # --- Carga de páginas según la selección ---
     if page == "Estadísticas Jugadores":
@@ -0,0 +1,95 @@
+# Mide el arranque de la app en procesos nuevos (sin nada importado ni en caché
+# de memoria) y falla si la importación del login supera el presupuesto o si
+# arrastra los módulos de gráficos.
+#
+#   python -m benchmarks.bench_arranque [--repeticiones 3] [--presupuesto-ms 400]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.join(os.path.dirname(__file__), '..')
+
+# Módulos que no deben cargarse hasta que una página los necesite
+MODULOS_PESADOS = ['matplotlib', 'seaborn', 'mplsoccer', 'PIL', 'pyarrow', 'pandas']
+
+# Importaciones de la pantalla de login, descontando lo que ya cuesta streamlit
+_IMPORTACION = """
+import json, sys, time
+inicio = time.perf_counter()
+import streamlit
+base = time.perf_counter()
+import utils.login, utils.arranque
+fin = time.perf_counter()
+print(json.dumps({'streamlit': base - inicio, 'login': fin - base,
+                  'cargados': [m for m in %r if m in sys.modules]}))
+"""
+
+# Primer render del script principal (sin sesión iniciada: formulario de login)
+_LOGIN = """
+import json, time
+inicio = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file('app.py', default_timeout=120)
+at.run()
+print(json.dumps({'segundos': time.perf_counter() - inicio, 'error': bool(at.exception),
+                  'formulario': len(at.text_input) == 2}))
+"""
+
+# Primer render de una página con el usuario ya dentro
+_PAGINA = """
+import json, time
+inicio = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+
+at = AppTest.from_string("from pages.Estadisticas_Jugadores import app\\napp()", default_timeout=120)
+at.run()
+print(json.dumps({'segundos': time.perf_counter() - inicio, 'error': bool(at.exception),
+                  'formulario': False}))
+"""
+
+
+def _ejecutar(codigo):
+    entorno = dict(os.environ, PYTHONPATH=os.path.abspath(RAIZ), APP_PRECALENTAR='0')
+    salida = subprocess.run([sys.executable, '-c', codigo], cwd=RAIZ, env=entorno,
+                            capture_output=True, text=True, check=True)
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--presupuesto-ms', type=float, default=400,
+                        help="máximo para importar el login (sin contar streamlit)")
+    args = parser.parse_args()
+
+    importaciones = [_ejecutar(_IMPORTACION % MODULOS_PESADOS) for _ in range(args.repeticiones)]
+    login = [_ejecutar(_LOGIN) for _ in range(args.repeticiones)]
+    pagina = [_ejecutar(_PAGINA) for _ in range(args.repeticiones)]
+
+    importacion_ms = statistics.median(r['login'] for r in importaciones) * 1000
+    cargados = sorted({m for r in importaciones for m in r['cargados']})
+    print(f"import streamlit:          {statistics.median(r['streamlit'] for r in importaciones) * 1000:7.0f} ms")
+    print(f"import login:              {importacion_ms:7.0f} ms (presupuesto {args.presupuesto_ms:.0f} ms)")
+    print(f"hasta formulario de login: {statistics.median(r['segundos'] for r in login) * 1000:7.0f} ms")
+    print(f"hasta primera página:      {statistics.median(r['segundos'] for r in pagina) * 1000:7.0f} ms")
+
+    fallos = []
+    if importacion_ms > args.presupuesto_ms:
+        fallos.append(f"la importación del login tarda {importacion_ms:.0f} ms")
+    if cargados:
+        fallos.append(f"el login importa módulos pesados: {', '.join(cargados)}")
+    if any(r['error'] or not r['formulario'] for r in login):
+        fallos.append("el formulario de login no se ha renderizado")
+    if any(r['error'] for r in pagina):
+        fallos.append("la página de jugadores ha fallado")
+
+    for fallo in fallos:
+        print(f"FALLO: {fallo}")
+    sys.exit(1 if fallos else 0)
+
+
+if __name__ == '__main__':
+    main()
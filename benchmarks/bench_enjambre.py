@@ -0,0 +1,67 @@
+# Compara el beeswarm vectorizado (utils.radar.calcular_beeswarm) con
+# sns.swarmplot para grupos de comparables de distinto tamaño.
+#
+#   python -m benchmarks.bench_enjambre [--tamanos 100 300 600 1200] [--max-seaborn 700]
+import argparse
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+
+from utils.dataset import cargar_dataset
+from utils.radar import DPI_RADAR, ESCALA_ENJAMBRE, calcular_beeswarm, renderizar_enjambre
+
+
+def _grupo_sintetico(base, n, rng):
+    # Remuestrea el grupo real con algo de ruido para simular ligas más grandes
+    filas = rng.integers(0, len(base), size=n)
+    ruido = rng.normal(0, 0.02, size=(n, base.shape[1])) * np.nanstd(base, axis=0)
+    return base[filas] + ruido
+
+
+def _medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--posicion', default='MF')
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[100, 300, 600, 1200, 2400])
+    parser.add_argument('--max-seaborn', type=int, default=700)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    datos = cargar_dataset()
+    base = np.asarray(datos.bloques[args.posicion].matriz, dtype=np.float64)
+    rng = np.random.default_rng(0)
+    dpi = DPI_RADAR * ESCALA_ENJAMBRE
+
+    print(f"{'n':>6} {'métricas':>9} {'layout numpy':>13} {'render numpy':>13} {'render seaborn':>15}")
+    for n in args.tamanos:
+        grupo = _grupo_sintetico(base, n, rng)
+        m = grupo.shape[1]
+
+        t_layout = _medir(lambda: calcular_beeswarm(grupo), args.repeticiones)
+
+        def render_numpy():
+            y, xmins, xmaxs = calcular_beeswarm(grupo)
+            for j in range(m):
+                renderizar_enjambre(grupo[:, j], 0, dpi, y=y[:, j], xlim=(xmins[j], xmaxs[j]))
+
+        def render_seaborn():
+            for j in range(m):
+                renderizar_enjambre(grupo[:, j], 0, dpi)
+
+        t_numpy = _medir(render_numpy, args.repeticiones)
+        t_seaborn = _medir(render_seaborn, 1) if n <= args.max_seaborn else float('nan')
+        print(f"{n:>6} {m:>9} {t_layout*1000:>11.1f}ms {t_numpy:>12.2f}s {t_seaborn:>14.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+# Prueba el planificador de peticiones contra el stub con cuota y errores:
+# cuota agotada con 429 + Retry-After, cuota agotada con 200 y
+# errors.rateLimit, y un 15 % de respuestas 500. El cubo de tokens arranca con
+# una cuota mayor que la real y tiene que ajustarse con las cabeceras.
+# Falla si alguna petición no acaba bien o si hay más rechazos por cuota que
+# la primera ráfaga (antes de conocer la cuota real) más uno por ventana: el
+# cubo se rellena de forma continua y el servidor cuenta ventanas fijas, pero
+# tras un rechazo nadie vuelve a salir hasta que se renueva la cuota.
+#
+#   python -m benchmarks.bench_planificador [--peticiones 30] [--hilos 4]
+#                                          [--limite 5] [--ventana 2]
+import argparse
+import math
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.stub_api import ServidorStub
+from utils.planificador_api import CuboTokens, Planificador
+
+ESCENARIOS = {
+    'cuota_429': {'limite_como_error': False, 'tasa_errores': 0.0},
+    'cuota_rate_limit': {'limite_como_error': True, 'tasa_errores': 0.0},
+    'errores_500': {'limite_como_error': False, 'tasa_errores': 0.15},
+}
+
+
+def _correcta(response):
+    if response.status_code != 200:
+        return False
+    try:
+        return not response.json().get('errors')
+    except ValueError:
+        return False
+
+
+def ejecutar_escenario(nombre, peticiones, hilos, limite, ventana):
+    opciones = ESCENARIOS[nombre]
+    # Sin cuota que agotar en el escenario de errores: solo se prueban los 5xx
+    limite_servidor = limite if opciones['tasa_errores'] == 0 else peticiones * 10
+    servidor = ServidorStub(0, limite=limite_servidor, ventana=ventana, semilla=1, **opciones).iniciar()
+    planificador = Planificador(cubo=CuboTokens(limite_servidor * 10, ventana=ventana), max_reintentos=8,
+                                espera_base=0.1, espera_max=ventana)
+    sesion = requests.Session()
+
+    def pedir(i):
+        params = {'league': 140, 'season': 2024 - i, 'team': 140003}
+        return planificador.ejecutar(('fixtures', i), lambda: sesion.get(f"{servidor.url}/fixtures", params=params,
+                                                                        timeout=10))
+
+    inicio = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(hilos) as pool:
+            respuestas = list(pool.map(pedir, range(peticiones)))
+    finally:
+        servidor.parar()
+
+    resultado = {
+        'segundos': time.perf_counter() - inicio,
+        'correctas': sum(_correcta(r) for r in respuestas),
+        'rechazos_cuota': servidor.respuestas[429] + servidor.respuestas['rateLimit'],
+        'errores_500': servidor.respuestas[500],
+        **planificador.resumen(),
+    }
+    fallos = []
+    if resultado['correctas'] != peticiones:
+        fallos.append(f"{peticiones - resultado['correctas']} peticiones sin respuesta válida")
+    maximo = hilos + math.ceil(peticiones / limite_servidor)
+    if resultado['rechazos_cuota'] > maximo:
+        fallos.append(f"{resultado['rechazos_cuota']} rechazos por cuota (máximo esperado {maximo})")
+    if opciones['tasa_errores'] and not resultado['errores_500']:
+        fallos.append("el stub no ha inyectado errores 500")
+    if resultado['reintentos'] < resultado['errores_500'] + resultado['rechazos_cuota']:
+        fallos.append("hay errores que no se han reintentado")
+    return resultado, fallos
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--escenarios', nargs='+', choices=list(ESCENARIOS), default=list(ESCENARIOS))
+    parser.add_argument('--peticiones', type=int, default=30)
+    parser.add_argument('--hilos', type=int, default=4)
+    parser.add_argument('--limite', type=int, default=5, help="peticiones por ventana del stub")
+    parser.add_argument('--ventana', type=float, default=2, help="segundos de la ventana de cuota")
+    args = parser.parse_args()
+
+    fallos = []
+    for nombre in args.escenarios:
+        resultado, fallos_escenario = ejecutar_escenario(nombre, args.peticiones, args.hilos, args.limite,
+                                                         args.ventana)
+        print(f"{nombre:18s} {resultado['segundos']:6.1f} s  correctas {resultado['correctas']}/{args.peticiones}  "
+              f"rechazos por cuota {resultado['rechazos_cuota']}  500 {resultado['errores_500']}  "
+              f"reintentos {resultado['reintentos']}  espera {resultado['segundos_espera']:.1f} s")
+        fallos += [f"{nombre}: {fallo}" for fallo in fallos_escenario]
+
+    for fallo in fallos:
+        print(f"FALLO: {fallo}")
+    sys.exit(1 if fallos else 0)
+
+
+if __name__ == '__main__':
+    main()
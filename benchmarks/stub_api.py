@@ -0,0 +1,222 @@
+# Servidor HTTP local que imita a api-sports para medir la página de equipos
+# sin red ni cuota. Sirve las respuestas grabadas en benchmarks/grabaciones/
+# (una por endpoint + parámetros) y, si falta alguna, genera una respuesta
+# sintética determinista con la misma forma.
+#
+# Aplica una cuota por ventana fija como la real (X-RateLimit-Remaining va
+# bajando y, agotada, responde 429 con Retry-After o un 200 con
+# errors.rateLimit) y puede inyectar errores 5xx para probar los reintentos.
+#
+#   python -m benchmarks.stub_api [--puerto 8765] [--latencia-ms 80]
+#                                 [--limite 300] [--ventana 60] [--tasa-errores 0.15]
+#                                 [--limite-como-error]
+#   python -m benchmarks.stub_api --grabar --api-key XXX --liga 140 --equipo 529
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+DIR_GRABACIONES = os.path.join(os.path.dirname(__file__), 'grabaciones')
+URL_REAL = "https://v3.football.api-sports.io"
+
+# Cuota por minuto que anuncia el stub en las cabeceras de rate limit
+LIMITE_POR_MINUTO = 300
+
+
+def nombre_grabacion(endpoint, params):
+    consulta = urlencode(sorted((k, str(v)) for k, v in params.items()))
+    return f"{endpoint.strip('/').replace('/', '_')}-{hashlib.sha1(consulta.encode()).hexdigest()[:12]}.json"
+
+
+def _equipos(liga):
+    rng = random.Random(liga)
+    return [{'team': {'id': liga * 1000 + i, 'name': f"Equipo {liga}-{i:02d}"}} for i in range(rng.randint(18, 20))]
+
+
+def _partidos(liga, temporada, equipo=None):
+    # Liga a doble vuelta con marcadores pseudoaleatorios fijados por la semilla
+    rng = random.Random(f"{liga}-{temporada}")
+    equipos = [e['team'] for e in _equipos(liga)]
+    partidos = []
+    for jornada, (local, visitante) in enumerate((a, b) for a in equipos for b in equipos if a is not b):
+        if equipo is not None and equipo not in (local['id'], visitante['id']):
+            rng.random()
+            continue
+        fecha = date(temporada, 8, 15) + timedelta(days=(jornada // 10) * 7)
+        partidos.append({
+            'fixture': {'id': int(f"{temporada}{liga:03d}{jornada:04d}"),
+                        'date': f"{fecha.isoformat()}T18:00:00+00:00",
+                        'status': {'short': 'FT'}},
+            'league': {'id': liga, 'name': f"Liga {liga}", 'season': temporada},
+            'teams': {'home': local, 'away': visitante},
+            'goals': {'home': rng.randint(0, 4), 'away': rng.randint(0, 3)},
+        })
+    return partidos
+
+
+def respuesta_sintetica(endpoint, params):
+    if endpoint == 'leagues':
+        datos = [{'league': {'id': int(params.get('id', 0))},
+                  'seasons': [{'year': anio} for anio in range(2010, 2025)]}]
+    elif endpoint == 'teams':
+        datos = _equipos(int(params['league']))
+    elif endpoint == 'fixtures':
+        equipo = int(params['team']) if 'team' in params else None
+        datos = _partidos(int(params['league']), int(params['season']), equipo)
+    else:
+        datos = []
+    return {'get': endpoint, 'parameters': params, 'errors': [], 'results': len(datos), 'response': datos}
+
+
+class ServidorStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, puerto=0, latencia=0.0, directorio=DIR_GRABACIONES, limite=LIMITE_POR_MINUTO,
+                 ventana=60.0, tasa_errores=0.0, limite_como_error=False, semilla=0):
+        super().__init__(('127.0.0.1', puerto), _Manejador)
+        self.latencia = latencia
+        self.directorio = directorio
+        self.limite = limite
+        self.ventana = ventana
+        self.tasa_errores = tasa_errores
+        self.limite_como_error = limite_como_error
+        self.peticiones = 0
+        # Respuestas enviadas por tipo: 200, 429, 500 y 'rateLimit' (200 con errors)
+        self.respuestas = Counter()
+        self._rng = random.Random(semilla)
+        self._inicio_ventana = time.monotonic()
+        self._usadas = 0
+        self._lock = threading.Lock()
+        self._hilo = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def cuerpo(self, endpoint, params):
+        ruta = os.path.join(self.directorio, nombre_grabacion(endpoint, params))
+        if os.path.exists(ruta):
+            with open(ruta, 'rb') as f:
+                return f.read()
+        return json.dumps(respuesta_sintetica(endpoint, params)).encode('utf-8')
+
+    def turno(self):
+        # Decide la respuesta de una petición: (código, restantes, segundos
+        # hasta que se renueva la cuota, error inyectado)
+        with self._lock:
+            self.peticiones += 1
+            ahora = time.monotonic()
+            if ahora - self._inicio_ventana >= self.ventana:
+                self._inicio_ventana, self._usadas = ahora, 0
+            renovacion = self.ventana - (ahora - self._inicio_ventana)
+            if self._usadas >= self.limite:
+                tipo = 'rateLimit' if self.limite_como_error else 429
+            else:
+                self._usadas += 1
+                tipo = 500 if self._rng.random() < self.tasa_errores else 200
+            self.respuestas[tipo] += 1
+            return tipo, self.limite - self._usadas, renovacion
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self.serve_forever, name='stub-api', daemon=True)
+        self._hilo.start()
+        return self
+
+    def parar(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = dict(parse_qsl(url.query))
+        servidor = self.server
+        tipo, restantes, renovacion = servidor.turno()
+        if servidor.latencia:
+            time.sleep(servidor.latencia)
+
+        cabeceras = {'X-RateLimit-Limit': str(servidor.limite), 'X-RateLimit-Remaining': str(restantes)}
+        if tipo == 429:
+            codigo, cabeceras['Retry-After'] = 429, str(math.ceil(renovacion))
+            cuerpo = json.dumps({'message': 'Too many requests'}).encode('utf-8')
+        elif tipo == 'rateLimit':
+            codigo = 200
+            cuerpo = json.dumps({'get': url.path.strip('/'), 'parameters': params, 'results': 0, 'response': [],
+                                 'errors': {'rateLimit': 'Too many requests. Your rate limit is '
+                                                         f"{servidor.limite} requests per minute."}}).encode('utf-8')
+        elif tipo == 500:
+            codigo, cuerpo = 500, b'{"message": "Internal error"}'
+        else:
+            codigo, cuerpo = 200, servidor.cuerpo(url.path.strip('/'), params)
+
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        for nombre, valor in cabeceras.items():
+            self.send_header(nombre, valor)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def grabar(api_key, liga, equipo, temporadas, directorio=DIR_GRABACIONES):
+    # Guarda respuestas reales de api-sports para que el stub las reproduzca
+    import requests
+
+    os.makedirs(directorio, exist_ok=True)
+    peticiones = [('leagues', {'id': liga}), ('teams', {'league': liga, 'season': temporadas[0]})]
+    peticiones += [('fixtures', {'league': liga, 'season': t, 'team': equipo}) for t in temporadas]
+    for endpoint, params in peticiones:
+        params = {k: str(v) for k, v in params.items()}
+        response = requests.get(f"{URL_REAL}/{endpoint}", headers={'x-apisports-key': api_key},
+                                params=params, timeout=30)
+        response.raise_for_status()
+        with open(os.path.join(directorio, nombre_grabacion(endpoint, params)), 'wb') as f:
+            f.write(response.content)
+        print(f"{endpoint} {params}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--latencia-ms', type=float, default=80)
+    parser.add_argument('--limite', type=int, default=LIMITE_POR_MINUTO, help="peticiones por ventana")
+    parser.add_argument('--ventana', type=float, default=60, help="segundos de la ventana de cuota")
+    parser.add_argument('--tasa-errores', type=float, default=0.0, help="fracción de respuestas 500")
+    parser.add_argument('--limite-como-error', action='store_true',
+                        help="cuota agotada como 200 con errors.rateLimit en vez de 429")
+    parser.add_argument('--grabar', action='store_true')
+    parser.add_argument('--api-key')
+    parser.add_argument('--liga', type=int, default=140)
+    parser.add_argument('--equipo', type=int)
+    parser.add_argument('--temporadas', type=int, nargs='+', default=[2024, 2023, 2022])
+    args = parser.parse_args()
+
+    if args.grabar:
+        if not args.api_key or args.equipo is None:
+            parser.error("--grabar necesita --api-key y --equipo")
+        grabar(args.api_key, args.liga, args.equipo, args.temporadas)
+        return
+
+    servidor = ServidorStub(args.puerto, args.latencia_ms / 1000, limite=args.limite, ventana=args.ventana,
+                            tasa_errores=args.tasa_errores, limite_como_error=args.limite_como_error)
+    print(f"Stub de api-sports en {servidor.url} (API_SPORTS_URL={servidor.url})")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,318 @@
+# Suite de benchmarks reproducible: mide las rutas calientes de la app y
+# escribe un JSON con p50/p95 y pico de memoria por área, para comparar
+# ejecuciones a lo largo del tiempo sin red (la API se sustituye por el stub).
+#
+#   python -m benchmarks.suite [--areas carga comparables similares radar pdf api]
+#                              [--repeticiones 5] [--latencia-ms 50]
+#                              [--salida benchmarks/resultados/<fecha>.json]
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DIR_RESULTADOS = os.path.join(os.path.dirname(__file__), 'resultados')
+
+AREAS = ['carga', 'comparables', 'similares', 'radar', 'pdf', 'api']
+
+
+def medir(funcion, repeticiones, preparar=None):
+    # Tiempos de `funcion()` en ms y, en una ejecución aparte (tracemalloc
+    # ralentiza), el pico de memoria asignada por Python/numpy en MB
+    tiempos = []
+    for _ in range(repeticiones):
+        if preparar:
+            preparar()
+        gc.collect()
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+
+    if preparar:
+        preparar()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        funcion()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'repeticiones': repeticiones,
+        'p50_ms': float(np.percentile(tiempos, 50)),
+        'p95_ms': float(np.percentile(tiempos, 95)),
+        'min_ms': float(min(tiempos)),
+        'pico_memoria_mb': pico / 1e6,
+    }
+
+
+def bench_carga(repeticiones, temporal, temporadas=15, **_):
+    # Lectura de los Excel de data/: en frío (parseo con openpyxl y conversión
+    # a Arrow) y en caliente (copia Arrow mapeada en memoria). Después, un
+    # archivo Parquet con el Excel repetido en varias temporadas: lo que
+    # lee la página (una competición y una posición) frente al archivo entero
+    from utils import data_cache
+    from utils.archivo_jugadores import cargar_fichas, cargar_posicion, escribir_temporada, leer_particiones
+    from utils.dataset import RUTA_DATOS, RUTA_METRICAS, cargar_dataset
+
+    cache = os.path.join(temporal, 'cache_datos')
+    data_cache.CACHE_DIR = cache
+
+    def vaciar():
+        shutil.rmtree(cache, ignore_errors=True)
+
+    rutas = (os.path.join(RAIZ, RUTA_DATOS), os.path.join(RAIZ, RUTA_METRICAS))
+    resultados = {
+        'excel_frio': medir(lambda: cargar_dataset(*rutas), max(1, repeticiones // 2), preparar=vaciar),
+        'arrow_caliente': medir(lambda: cargar_dataset(*rutas), repeticiones),
+    }
+
+    archivo = os.path.join(temporal, 'jugadores')
+    df = data_cache.cargar_excel_columnar(rutas[0])
+    for anio in range(2024 - temporadas, 2024):
+        escribir_temporada(df, f"{anio}/{anio + 1}", archivo)
+    competicion, posicion = df['Competicion'].iloc[0], df['Pos'].iloc[0]
+
+    resultados['parquet_seleccion'] = medir(
+        lambda: (cargar_fichas('2023/2024', competicion, archivo), cargar_posicion('2023/2024', posicion, archivo)),
+        repeticiones)
+    resultados['parquet_archivo_completo'] = medir(
+        lambda: [leer_particiones(f"{anio}/{anio + 1}", ruta=archivo) for anio in range(2024 - temporadas, 2024)],
+        max(1, repeticiones // 2))
+    resultados['parquet_archivo_completo']['temporadas'] = temporadas
+    return resultados
+
+
+def _datos(temporal):
+    from utils import data_cache
+    from utils.dataset import RUTA_DATOS, RUTA_METRICAS, RUTA_NOMBRES, cargar_dataset, cargar_nombres_visuales
+
+    data_cache.CACHE_DIR = os.path.join(temporal, 'cache_datos')
+    datos = cargar_dataset(os.path.join(RAIZ, RUTA_DATOS), os.path.join(RAIZ, RUTA_METRICAS))
+    return datos, cargar_nombres_visuales(os.path.join(RAIZ, RUTA_NOMBRES))
+
+
+def bench_comparables(repeticiones, temporal, **_):
+    # Filtrado de comparables para todas las posiciones y mínimos de partidos
+    datos, _ = _datos(temporal)
+
+    def filtrar():
+        for bloque in datos.bloques.values():
+            for partidos_min in range(1, 39):
+                bloque.seleccionar(partidos_min)
+
+    return {'todas_posiciones_1_a_38': medir(filtrar, repeticiones * 20)}
+
+
+def bench_similares(repeticiones, temporal, partidos_min=5, jugadores=50000, **_):
+    # Top-10 de similares sobre los datos reales (todas las posiciones) y sobre
+    # un grupo sintético del tamaño de varias temporadas y ligas juntas
+    from utils.dataset import BloqueComparables
+
+    datos, _ = _datos(temporal)
+    consultas = [(bloque, int(bloque.filas[-1])) for bloque in datos.bloques.values() if len(bloque.filas)]
+
+    def reales():
+        for bloque, fila in consultas:
+            bloque.similares(fila, partidos_min, 10)
+
+    rng = np.random.default_rng(0)
+    sintetico = BloqueComparables('sintetico', [f"m{i}" for i in range(16)], np.arange(jugadores),
+                                  rng.integers(0, 39, jugadores).astype(np.int16),
+                                  rng.normal(size=(jugadores, 16)).astype(np.float32))
+    resultado = medir(lambda: sintetico.similares(jugadores // 2, partidos_min, 10), repeticiones * 20)
+    resultado['jugadores'] = jugadores
+    return {'todas_posiciones_top10': medir(reales, repeticiones * 20), f"sintetico_{jugadores}_top10": resultado}
+
+
+def _jugador_de_posicion(datos, bloque, partidos_min):
+    filas, _ = bloque.seleccionar(partidos_min)
+    fila = int(filas[len(filas) // 2])
+    return fila, datos.ficha(fila), bloque.valores_jugador(fila, partidos_min)
+
+
+def bench_radar(repeticiones, temporal, partidos_min=5, **_):
+    # Radar completo (fondo + jugador + WebP) por posición, sin almacén de
+    # artefactos: en frío (fondo sin cachear) y con el fondo ya en memoria
+    from utils import radar
+
+    datos, nombres = _datos(temporal)
+
+    def vaciar():
+        radar._fondos.clear()
+        radar._coordenadas.clear()
+
+    resultados = {}
+    for posicion, bloque in datos.bloques.items():
+        _, valores = bloque.seleccionar(partidos_min)
+        if len(valores) == 0:
+            continue
+        _, ficha, valores_jugador = _jugador_de_posicion(datos, bloque, partidos_min)
+
+        def render():
+            fondo = radar.obtener_fondo(posicion, partidos_min, datos.version, bloque.metricas, valores, nombres,
+                                        dpi=radar.DPI_PANTALLA, fuente=datos.fuente)
+            fig = radar.componer_radar(fondo, bloque.metricas, valores_jugador, ficha, dpi=radar.DPI_PANTALLA)
+            return radar.vista_previa(fig)
+
+        resultados[f"{posicion}_frio"] = medir(render, repeticiones, preparar=vaciar)
+        resultados[f"{posicion}_fondo_cacheado"] = medir(render, repeticiones)
+        resultados[f"{posicion}_frio"]['comparables'] = int(len(valores))
+    return resultados
+
+
+def bench_pdf(repeticiones, temporal, partidos_min=5, paginas=10, **_):
+    # Informe PDF de varias páginas a partir de radares PNG a 300 dpi
+    from utils import radar
+    from utils.pdf_export import generar_informe_pdf
+
+    datos, nombres = _datos(temporal)
+    posicion, bloque = next(iter(datos.bloques.items()))
+    filas, valores = bloque.seleccionar(partidos_min)
+    fondo = radar.obtener_fondo(posicion, partidos_min, datos.version, bloque.metricas, valores, nombres,
+                                fuente=datos.fuente)
+    imagenes = []
+    for fila in filas[:paginas]:
+        ficha = datos.ficha(int(fila))
+        fig = radar.componer_radar(fondo, bloque.metricas, bloque.valores_jugador(int(fila), partidos_min), ficha,
+                                   dpi=radar.DPI_RADAR)
+        imagenes.append((ficha['Player'], radar.exportar_figura(fig, 'png')))
+
+    tamanos = []
+
+    def informe():
+        tamanos.append(len(generar_informe_pdf(imagenes)))
+
+    resultado = medir(informe, repeticiones)
+    resultado['paginas'] = len(imagenes)
+    resultado['bytes'] = tamanos[-1]
+    return {f"informe_{len(imagenes)}_paginas": resultado}
+
+
+def bench_api(repeticiones, temporal, latencia=0.05, temporadas=15, **_):
+    # Página de equipos contra el stub: descarga de las temporadas (almacén
+    # vacío y ya sincronizado) y agregación de la tabla de partidos
+    from benchmarks.stub_api import LIMITE_POR_MINUTO, ServidorStub
+    from utils import almacen_partidos, api_utils
+    from utils.planificador_api import CuboTokens, Planificador
+    from utils.tabla_partidos import concatenar, normalizar_partidos, resumen_por_temporada, tabla_resultados
+
+    servidor = ServidorStub(0, latencia).iniciar()
+    api_utils.API_URL = servidor.url
+    api_utils.CACHE_PATH = os.path.join(temporal, 'api_sports')
+    api_utils._sesion = None
+    api_utils.planificador = Planificador(cubo=CuboTokens(LIMITE_POR_MINUTO))
+
+    liga, equipo = 140, 140003
+    lista_temporadas = list(range(2024, 2024 - temporadas, -1))
+    almacenes = iter(range(10 ** 6))
+
+    def almacen_nuevo():
+        almacen_partidos.RUTA_ALMACEN = os.path.join(temporal, f"partidos_{next(almacenes)}.sqlite")
+        almacen_partidos._esquema_creado = False
+
+    def descargar():
+        return list(almacen_partidos.partidos_por_temporada('stub', liga, lista_temporadas, equipo))
+
+    def agregar(temporadas_descargadas):
+        tabla = concatenar([normalizar_partidos(p, temporada=t) for t, p in temporadas_descargadas])
+        return resumen_por_temporada(tabla, equipo), tabla_resultados(tabla)
+
+    try:
+        resultados = {
+            'descarga_almacen_vacio': medir(descargar, repeticiones, preparar=almacen_nuevo),
+            'descarga_almacen_sincronizado': medir(descargar, repeticiones),
+        }
+        descargadas = descargar()
+        resultados['agregacion'] = medir(lambda: agregar(descargadas), repeticiones * 5)
+        resultados['agregacion']['partidos'] = sum(len(p) for _, p in descargadas)
+        resultados['descarga_almacen_vacio']['latencia_ms'] = latencia * 1000
+    finally:
+        servidor.parar()
+    return resultados
+
+
+BENCHMARKS = {
+    'carga': bench_carga,
+    'comparables': bench_comparables,
+    'similares': bench_similares,
+    'radar': bench_radar,
+    'pdf': bench_pdf,
+    'api': bench_api,
+}
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _pico_proceso_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss está en KB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--areas', nargs='+', choices=AREAS, default=AREAS)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--latencia-ms', type=float, default=50)
+    parser.add_argument('--temporadas', type=int, default=15)
+    parser.add_argument('--partidos-min', type=int, default=5)
+    parser.add_argument('--salida')
+    args = parser.parse_args()
+
+    os.chdir(RAIZ)
+    temporal = tempfile.mkdtemp(prefix='bench_')
+    informe = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'parametros': vars(args),
+        'resultados': {},
+    }
+    try:
+        for area in args.areas:
+            inicio = time.perf_counter()
+            informe['resultados'][area] = BENCHMARKS[area](
+                args.repeticiones, temporal, latencia=args.latencia_ms / 1000,
+                temporadas=args.temporadas, partidos_min=args.partidos_min)
+            for nombre, r in informe['resultados'][area].items():
+                print(f"{area:12s} {nombre:32s} p50 {r['p50_ms']:9.1f} ms  p95 {r['p95_ms']:9.1f} ms  "
+                      f"pico {r['pico_memoria_mb']:7.1f} MB")
+            print(f"{area:12s} ({time.perf_counter() - inicio:.1f} s)", file=sys.stderr)
+    finally:
+        shutil.rmtree(temporal, ignore_errors=True)
+    informe['pico_proceso_mb'] = _pico_proceso_mb()
+
+    salida = args.salida or os.path.join(DIR_RESULTADOS, f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, 'w', encoding='utf-8') as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+    print(f"Resultados en {salida}")
+
+
+if __name__ == '__main__':
+    main()
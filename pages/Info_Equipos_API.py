@@ -1,17 +1,70 @@
 import streamlit as st
 from utils.api_utils import (
     get_league_seasons,
-    get_teams_by_league,
-    get_team_fixtures
+    resumen_cache
 )
-import pandas as pd
-import matplotlib.pyplot as plt
+from utils.almacen_partidos import partidos_por_temporada, temporadas_guardadas
+from utils.temporadas import iniciar_refresco, resolver_temporada
+
+def grafico_evolucion(df_resumen):
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots()
+    ax.plot(df_resumen["Año"], df_resumen["V"], marker='o', label='Victorias', color='green')
+    ax.plot(df_resumen["Año"], df_resumen["E"], marker='o', label='Empates', color='orange')
+    ax.plot(df_resumen["Año"], df_resumen["D"], marker='o', label='Derrotas', color='red')
+    ax.set_title("Evolución de resultados por año")
+    ax.set_xlabel("Año")
+    ax.set_ylabel("Partidos")
+    ax.legend()
+    ax.grid(True)
+    return fig
+
+def grafico_goles(df_resumen):
+    import matplotlib.pyplot as plt
+    fig2, ax2 = plt.subplots()
+    width = 0.35
+    x = range(len(df_resumen))
+    ax2.bar([i - width/2 for i in x], df_resumen["GF"], width=width, color='green', label='Goles a favor')
+    ax2.bar([i + width/2 for i in x], df_resumen["GC"], width=width, color='red', label='Goles en contra')
+    for i in x:
+        ax2.text(i - width/2, df_resumen["GF"].iloc[i] + 0.5, str(df_resumen["GF"].iloc[i]), ha='center', color='black')
+        ax2.text(i + width/2, df_resumen["GC"].iloc[i] + 0.5, str(df_resumen["GC"].iloc[i]), ha='center', color='black')
+    ax2.set_xticks(list(x))
+    ax2.set_xticklabels(df_resumen["Año"].astype(str))
+    ax2.set_title("Goles a favor vs en contra")
+    ax2.legend()
+    return fig2
+
+def dibujar_resultados(partidos_equipo, team_id, hueco_evolucion, hueco_goles, hueco_tabla):
+    import matplotlib.pyplot as plt
+    from utils.tabla_partidos import resumen_por_temporada, tabla_resultados
+
+    # Resumen global por año
+    df_resumen = resumen_por_temporada(partidos_equipo, team_id)
+
+    # Visualizaciones generales
+    fig = grafico_evolucion(df_resumen)
+    hueco_evolucion.pyplot(fig)
+    plt.close(fig)
+    fig2 = grafico_goles(df_resumen)
+    hueco_goles.pyplot(fig2)
+    plt.close(fig2)
+
+    # Mostrar la tabla de resultados con colores (Resultado con color en la misma celda)
+    df_resumen_partidos = tabla_resultados(partidos_equipo)
+    hueco_tabla.markdown(df_resumen_partidos.to_html(escape=False), unsafe_allow_html=True)  # Usamos to_html con escape=False para permitir el HTML en el resultado
 
 def app():
     st.title("📊 Resultados recientes de un equipo")
 
     api_key = st.secrets["api"]["api_key"]
 
+    cache = resumen_cache()
+    if cache['aciertos'] + cache['fallos']:
+        st.caption(f"Caché de la API: {cache['aciertos']} aciertos · {cache['fallos']} llamadas reales · "
+                   f"{cache['tasa_aciertos']:.0%} de acierto · {cache['reintentos']} reintentos · "
+                   f"{cache['deduplicadas']} peticiones compartidas")
+
     ligas = {
         "🇬🇧 Premier League": 39,
         "🇪🇸 La Liga": 140,
@@ -20,26 +73,22 @@ def app():
         "🇫🇷 Ligue 1": 61
     }
 
+    # La temporada vigente de cada liga se mantiene al día en segundo plano
+    iniciar_refresco(api_key, ligas.values())
+
     liga_seleccionada = st.selectbox("Selecciona una liga", ["Selecciona..."] + list(ligas.keys()))
     if liga_seleccionada == "Selecciona...":
         st.stop()
 
     league_id = ligas[liga_seleccionada]
 
-    # Obtener temporadas ordenadas
-    temporadas_disp = get_league_seasons(api_key, league_id, limit=None)
+    # Obtener temporadas ordenadas; sin conexión (y con la caché de ligas ya
+    # caducada) se usan las temporadas que hay en el almacén local
+    temporadas_disp = get_league_seasons(api_key, league_id, limit=None) or temporadas_guardadas(league_id)
     temporadas_ordenadas = sorted(temporadas_disp, reverse=True)
 
-    # Buscar temporada válida con equipos disponibles
-    temporada_actual = None
-    equipos = {}
-
-    for temporada in temporadas_ordenadas:
-        equipos_temp = get_teams_by_league(api_key, league_id, temporada)
-        if equipos_temp:
-            equipos = equipos_temp
-            temporada_actual = temporada
-            break
+    # Última temporada con equipos disponibles (memorizada por liga)
+    temporada_actual, equipos = resolver_temporada(api_key, league_id)
 
     if not temporada_actual or not equipos:
         st.warning("No se encontraron equipos disponibles para esta liga.")
@@ -50,104 +99,53 @@ def app():
         st.stop()
 
     team_id = equipos[equipo]
-    st.markdown("---")
-    st.subheader(f"📅 Resultados del {equipo} por año")
 
-    # Obtener todas las temporadas disponibles con fixtures
-    temporadas_resultados = {}
-    for temporada in temporadas_ordenadas:
-        partidos = get_team_fixtures(api_key, league_id, temporada, team_id)
-        partidos_filtrados = [
-            p for p in partidos
-            if p['teams']['home']['id'] == team_id or p['teams']['away']['id'] == team_id
-        ]
-        if partidos_filtrados:
-            # Ordenar los partidos por fecha dentro de cada temporada, de la más reciente a la más antigua
-            partidos_filtrados = sorted(partidos_filtrados, key=lambda p: p['fixture']['date'], reverse=True)
-            temporadas_resultados[temporada] = partidos_filtrados
+    # La tabla de partidos (pandas) y matplotlib solo hacen falta a partir de aquí
+    from utils.tabla_partidos import concatenar, normalizar_partidos
 
-    # Resumen global por año
-    resumen_anual = []
-    for temporada, lista in temporadas_resultados.items():
-        victorias = empates = derrotas = gf = gc = 0
-        for p in lista:
-            g_home = p['goals']['home']
-            g_away = p['goals']['away']
-            if g_home is None or g_away is None:
-                continue
-            home = p['teams']['home']['name']
-            es_local = home == equipo
-            goles_equipo = g_home if es_local else g_away
-            goles_rival = g_away if es_local else g_home
-            if goles_equipo > goles_rival:
-                victorias += 1
-            elif goles_equipo == goles_rival:
-                empates += 1
-            else:
-                derrotas += 1
-            gf += goles_equipo
-            gc += goles_rival
-        resumen_anual.append({"Año": temporada, "V": victorias, "E": empates, "D": derrotas, "GF": gf, "GC": gc})
-
-    df_resumen = pd.DataFrame(resumen_anual).sort_values("Año", ascending=False)
+    st.markdown("---")
+    st.subheader(f"📅 Resultados del {equipo} por año")
 
-    # Visualizaciones generales
+    # Huecos que se rellenan a medida que llegan las temporadas (de la más
+    # reciente a la más antigua): el primer gráfico aparece tras la primera respuesta
+    progreso = st.progress(0.0, text="Descargando temporadas...")
     st.markdown("---")
     c1, c2 = st.columns(2)
-
-    with c1:
-        fig, ax = plt.subplots()
-        ax.plot(df_resumen["Año"], df_resumen["V"], marker='o', label='Victorias', color='green')
-        ax.plot(df_resumen["Año"], df_resumen["E"], marker='o', label='Empates', color='orange')
-        ax.plot(df_resumen["Año"], df_resumen["D"], marker='o', label='Derrotas', color='red')
-        ax.set_title("Evolución de resultados por año")
-        ax.set_xlabel("Año")
-        ax.set_ylabel("Partidos")
-        ax.legend()
-        ax.grid(True)
-        st.pyplot(fig)
-
-    with c2:
-        fig2, ax2 = plt.subplots()
-        width = 0.35
-        x = range(len(df_resumen))
-        ax2.bar([i - width/2 for i in x], df_resumen["GF"], width=width, color='green', label='Goles a favor')
-        ax2.bar([i + width/2 for i in x], df_resumen["GC"], width=width, color='red', label='Goles en contra')
-        for i in x:
-            ax2.text(i - width/2, df_resumen["GF"].iloc[i] + 0.5, str(df_resumen["GF"].iloc[i]), ha='center', color='black')
-            ax2.text(i + width/2, df_resumen["GC"].iloc[i] + 0.5, str(df_resumen["GC"].iloc[i]), ha='center', color='black')
-        ax2.set_xticks(list(x))
-        ax2.set_xticklabels(df_resumen["Año"].astype(str))
-        ax2.set_title("Goles a favor vs en contra")
-        ax2.legend()
-        st.pyplot(fig2)
-
+    hueco_evolucion = c1.empty()
+    hueco_goles = c2.empty()
     st.markdown("---")
 
     # Mostrar los resultados por temporada ordenados por fecha (de la más reciente a la más antigua)
     st.markdown("### Resultados por temporada")
-
-    # Preparar los resultados de todos los partidos
-    resumen_partidos = []
-    for temporada, lista in temporadas_resultados.items():
-        for p in lista:
-            fecha = p['fixture']['date'][:10]
-            home = p['teams']['home']['name']
-            away = p['teams']['away']['name']
-            g_home = p['goals']['home']
-            g_away = p['goals']['away']
-            competicion = p['league']['name']
-            if g_home > g_away:
-                resultado = f"<span style='color:green;'>V</span>"  # Victoria
-            elif g_home == g_away:
-                resultado = f"<span style='color:orange;'>E</span>"  # Empate
-            else:
-                resultado = f"<span style='color:red;'>D</span>"  # Derrota
-            resumen_partidos.append({"Fecha": fecha, "Competición": competicion, "Resultado": resultado, "Partido": f"{home} {g_home} - {g_away} {away}"})
-
-    # Crear un DataFrame de los partidos
-    df_resumen_partidos = pd.DataFrame(resumen_partidos)
-
-    # Mostrar la tabla de resultados con colores (Resultado con color en la misma celda)
     st.markdown("### Resumen de partidos")
-    st.markdown(df_resumen_partidos.to_html(escape=False), unsafe_allow_html=True)  # Usamos to_html con escape=False para permitir el HTML en el resultado
\ No newline at end of file
+    hueco_tabla = st.empty()
+
+    # Las temporadas salen del almacén local; solo las que aún pueden cambiar
+    # se piden a la API, y de forma concurrente. Los gráficos y la tabla se
+    # redibujan solo cuando la siguiente temporada aún no ha llegado (hay que
+    # esperar a la red); lo que ya está guardado se pinta una sola vez al final
+    tablas = []
+    pendiente_dibujar = False
+    total = len(temporadas_ordenadas)
+    for i, (temporada, partidos, esperando) in enumerate(
+            partidos_por_temporada(api_key, league_id, temporadas_ordenadas, team_id, avisar_espera=True), start=1):
+        progreso.progress(i / total, text=f"Temporadas cargadas: {i}/{total}")
+
+        # Cada temporada se aplana una vez a la tabla de partidos; los resúmenes
+        # se recalculan sobre la tabla acumulada
+        tabla = normalizar_partidos(partidos, temporada=temporada)
+        tabla = tabla[(tabla['local_id'] == team_id) | (tabla['visitante_id'] == team_id)]
+        if not tabla.empty:
+            tablas.append(tabla)
+            pendiente_dibujar = True
+
+        if esperando and pendiente_dibujar:
+            dibujar_resultados(concatenar(tablas), team_id, hueco_evolucion, hueco_goles, hueco_tabla)
+            pendiente_dibujar = False
+
+    if pendiente_dibujar:
+        dibujar_resultados(concatenar(tablas), team_id, hueco_evolucion, hueco_goles, hueco_tabla)
+
+    progreso.empty()
+    if not tablas:
+        st.warning("No se encontraron partidos para este equipo.")
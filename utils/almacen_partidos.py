@@ -0,0 +1,152 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from requests_cache import DO_NOT_CACHE
+
+from utils import api_utils
+
+# Copia local de los partidos descargados. Un partido terminado no vuelve a
+# cambiar, así que solo se pide a la API lo que aún puede moverse: la
+# temporada en curso y las temporadas con partidos pendientes.
+RUTA_ALMACEN = os.path.join(os.path.dirname(__file__), '..', 'data', '.cache', 'partidos.sqlite')
+
+# Estados de api-sports que ya son definitivos
+ESTADOS_FINALES = {'FT', 'AET', 'PEN', 'CANC', 'ABD', 'AWD', 'WO'}
+
+# Cada cuánto se vuelve a preguntar por una temporada pasada que quedó con
+# partidos sin terminar (aplazados, suspendidos...)
+TTL_PENDIENTES = 24 * 3600
+
+# Tras un fallo de conexión se deja de intentar sincronizar durante un rato,
+# para que sin red la página no espere los reintentos de cada temporada
+PAUSA_SIN_CONEXION = 60
+_sin_conexion_hasta = 0.0
+
+_lock = threading.Lock()
+_esquema_creado = False
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS partidos (
+    fixture_id INTEGER PRIMARY KEY,
+    liga INTEGER NOT NULL,
+    temporada INTEGER NOT NULL,
+    local_id INTEGER NOT NULL,
+    visitante_id INTEGER NOT NULL,
+    fecha TEXT NOT NULL,
+    estado TEXT,
+    datos TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS partidos_liga_temporada ON partidos (liga, temporada);
+CREATE TABLE IF NOT EXISTS sincronizaciones (
+    liga INTEGER NOT NULL,
+    temporada INTEGER NOT NULL,
+    equipo INTEGER NOT NULL,
+    actualizado REAL NOT NULL,
+    pendientes INTEGER NOT NULL,
+    PRIMARY KEY (liga, temporada, equipo)
+);
+"""
+
+
+@contextmanager
+def _conectar():
+    # Una conexión por operación: se usa desde los hilos que descargan temporadas
+    global _esquema_creado
+    with _lock:
+        if not _esquema_creado:
+            os.makedirs(os.path.dirname(RUTA_ALMACEN), exist_ok=True)
+            with sqlite3.connect(RUTA_ALMACEN) as conexion:
+                conexion.execute("PRAGMA journal_mode=WAL")
+                conexion.executescript(_ESQUEMA)
+            conexion.close()
+            _esquema_creado = True
+    conexion = sqlite3.connect(RUTA_ALMACEN, timeout=30)
+    try:
+        with conexion:
+            yield conexion
+    finally:
+        conexion.close()
+
+
+def es_final(partido):
+    return partido['fixture']['status']['short'] in ESTADOS_FINALES
+
+
+def _sincronizacion(conexion, liga, temporada, equipo):
+    return conexion.execute(
+        "SELECT actualizado, pendientes FROM sincronizaciones WHERE liga = ? AND temporada = ? AND equipo = ?",
+        (liga, temporada, equipo),
+    ).fetchone()
+
+
+def necesita_sincronizar(liga, temporada, equipo, ahora=None):
+    ahora = ahora or time.time()
+    with _conectar() as conexion:
+        fila = _sincronizacion(conexion, liga, temporada, equipo)
+    if fila is None:
+        return True
+    actualizado, pendientes = fila
+    if int(temporada) >= api_utils.temporada_en_curso():
+        return ahora - actualizado > api_utils.TTL_FIXTURES_ACTUALES.total_seconds()
+    return bool(pendientes) and ahora - actualizado > TTL_PENDIENTES
+
+
+def guardar_partidos(liga, temporada, equipo, partidos):
+    filas = [
+        (p['fixture']['id'], liga, temporada, p['teams']['home']['id'], p['teams']['away']['id'],
+         p['fixture']['date'], p['fixture']['status']['short'], json.dumps(p, ensure_ascii=False))
+        for p in partidos
+    ]
+    pendientes = sum(not es_final(p) for p in partidos)
+    with _conectar() as conexion:
+        conexion.executemany("INSERT OR REPLACE INTO partidos VALUES (?, ?, ?, ?, ?, ?, ?, ?)", filas)
+        conexion.execute("INSERT OR REPLACE INTO sincronizaciones VALUES (?, ?, ?, ?, ?)",
+                         (liga, temporada, equipo, time.time(), pendientes))
+
+
+def leer_partidos(liga, temporada, equipo):
+    with _conectar() as conexion:
+        filas = conexion.execute(
+            "SELECT datos FROM partidos WHERE liga = ? AND temporada = ? AND (local_id = ? OR visitante_id = ?) "
+            "ORDER BY fecha DESC",
+            (liga, temporada, equipo, equipo),
+        ).fetchall()
+    return [json.loads(datos) for (datos,) in filas]
+
+
+def temporadas_guardadas(liga):
+    # Temporadas de la liga ya sincronizadas alguna vez, de la más reciente a
+    # la más antigua: sirven de lista de temporadas cuando no hay conexión
+    with _conectar() as conexion:
+        filas = conexion.execute(
+            "SELECT DISTINCT temporada FROM sincronizaciones WHERE liga = ? ORDER BY temporada DESC", (liga,),
+        ).fetchall()
+    return [temporada for (temporada,) in filas]
+
+
+def partidos_equipo(api_key, league_id, season, team_id):
+    # Partidos del equipo en la temporada, desde el almacén. Solo se llama a la
+    # API si la temporada aún puede cambiar; sin conexión se sirve lo guardado.
+    global _sin_conexion_hasta
+    if time.time() >= _sin_conexion_hasta and necesita_sincronizar(league_id, season, team_id):
+        params = {'league': league_id, 'season': season, 'team': team_id}
+        try:
+            # El almacén ya guarda la respuesta: no hace falta duplicarla en la caché HTTP
+            response = api_utils._get("fixtures", api_key, params, DO_NOT_CACHE)
+        except requests.RequestException:
+            response = None
+        if response is None or response.status_code == 504:
+            _sin_conexion_hasta = time.time() + PAUSA_SIN_CONEXION
+        if response is not None and response.status_code == 200 and not response.json().get('errors'):
+            guardar_partidos(league_id, season, team_id, response.json().get('response', []))
+    return leer_partidos(league_id, season, team_id)
+
+
+def partidos_por_temporada(api_key, league_id, temporadas, team_id, avisar_espera=False):
+    return api_utils.get_team_fixtures_por_temporada(api_key, league_id, temporadas, team_id,
+                                                     obtener=partidos_equipo, avisar_espera=avisar_espera)
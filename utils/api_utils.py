@@ -1,11 +1,147 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
 import requests
-from datetime import datetime
+import requests_cache
+from requests.adapters import HTTPAdapter
+from requests_cache import NEVER_EXPIRE
+
+from utils.metricas import tramo
+from utils.planificador_api import Planificador
+
+API_URL = os.environ.get('API_SPORTS_URL', "https://v3.football.api-sports.io")
+
+# Caché persistente de respuestas (SQLite), compartida por todas las sesiones
+CACHE_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', '.cache', 'api_sports')
+
+# Tiempo de vida por endpoint: ligas y equipos cambian poco, los partidos de
+# la temporada en curso sí, y los de temporadas terminadas ya no cambian
+TTL_LIGAS = timedelta(days=7)
+TTL_EQUIPOS = timedelta(days=1)
+TTL_FIXTURES_ACTUALES = timedelta(minutes=10)
+TTL_H2H = timedelta(hours=6)
+
+# Sin conexión o con la API caída se sirven copias caducadas hasta esta antigüedad
+ANTIGUEDAD_MAXIMA_SIN_CONEXION = timedelta(days=365)
+
+# Peticiones simultáneas como máximo al descargar varias temporadas
+MAX_PETICIONES_CONCURRENTES = int(os.environ.get('API_SPORTS_CONCURRENCIA', '4'))
+
+estadisticas_cache = {'aciertos': 0, 'fallos': 0}
+
+# Compartido por todas las sesiones de Streamlit del proceso
+planificador = Planificador()
+
+_sesion = None
+_sesion_lock = threading.Lock()
+_estadisticas_lock = threading.Lock()
 
-def get_league_seasons(api_key, league_id, limit=None):
-    url = f"https://v3.football.api-sports.io/leagues"
+
+def _respuesta_valida(response):
+    # api-sports responde 200 con 'errors' cuando se supera la cuota o falla la
+    # clave; esas respuestas no se guardan en caché. Los demás códigos ya los
+    # descarta allowable_codes: si aquí se rechazaran, requests-cache borraría
+    # la copia guardada al contestar 504 a una consulta solo-caché o al
+    # recibir un error, y no quedaría nada que servir sin conexión
+    if response.status_code != 200:
+        return True
+    try:
+        return not response.json().get('errors')
+    except ValueError:
+        return False
+
+
+def obtener_sesion():
+    # Sesión HTTP única con pool de conexiones (se reutilizan TCP y TLS entre
+    # llamadas) y caché en disco
+    global _sesion
+    with _sesion_lock:
+        if _sesion is None:
+            os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+            sesion = requests_cache.CachedSession(
+                CACHE_PATH,
+                backend='sqlite',
+                expire_after=TTL_EQUIPOS,
+                allowable_codes=(200,),
+                filter_fn=_respuesta_valida,
+                ignored_parameters=['x-apisports-key'],
+            )
+            adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            sesion.mount('https://', adaptador)
+            sesion.mount('http://', adaptador)
+            _sesion = sesion
+        return _sesion
+
+
+def temporada_en_curso(hoy=None):
+    # Las ligas europeas empiezan en verano: hasta julio sigue la del año anterior
+    hoy = hoy or datetime.today()
+    return hoy.year if hoy.month >= 7 else hoy.year - 1
+
+
+def ttl_fixtures(season):
+    return TTL_FIXTURES_ACTUALES if int(season) >= temporada_en_curso() else NEVER_EXPIRE
+
+
+def _get(endpoint, api_key, params, expire_after, forzar=False):
+    with tramo(f"api:{endpoint}", detalle=params):
+        return _get_sin_medir(endpoint, api_key, params, expire_after, forzar)
+
+
+def _get_sin_medir(endpoint, api_key, params, expire_after, forzar=False):
+    # Con `forzar` se ignora la copia en caché aunque siga vigente y se guarda
+    # la respuesta nueva (refrescos en segundo plano); si la petición falla se
+    # sigue sirviendo la copia guardada
     headers = {'x-apisports-key': api_key}
+    url = f"{API_URL}/{endpoint}"
+    sesion = obtener_sesion()
+
+    # Primero solo la caché: lo que ya está guardado no gasta cuota ni espera turno
+    if not forzar:
+        response = sesion.get(url, headers=headers, params=params, expire_after=expire_after, only_if_cached=True)
+        if response.status_code != 504:
+            with _estadisticas_lock:
+                estadisticas_cache['aciertos'] += 1
+            return response
+
+    def peticion():
+        with _estadisticas_lock:
+            estadisticas_cache['fallos'] += 1
+        return sesion.get(url, headers=headers, params=params, expire_after=expire_after, force_refresh=forzar)
+
+    clave = (endpoint, tuple(sorted((k, str(v)) for k, v in params.items())))
+    try:
+        response = planificador.ejecutar(clave, peticion)
+    except requests.RequestException:
+        response = None
+    if response is not None and response.status_code == 200:
+        return response
+
+    # Sin conexión o con la API caída se sirve la copia caducada, si la hay.
+    # stale-if-error necesita un valor en segundos: sin él requests-cache solo
+    # tolera un segundo de caducidad. No se activa en la sesión porque entonces
+    # la primera consulta (solo caché) también devolvería copias caducadas.
+    margen = int(ANTIGUEDAD_MAXIMA_SIN_CONEXION.total_seconds())
+    guardada = sesion.get(url, headers={**headers, 'Cache-Control': f"stale-if-error={margen}"}, params=params,
+                          only_if_cached=True)
+    if guardada.status_code == 200 or response is None:
+        return guardada
+    return response
+
+
+def resumen_cache():
+    with _estadisticas_lock:
+        aciertos, fallos = estadisticas_cache['aciertos'], estadisticas_cache['fallos']
+    total = aciertos + fallos
+    return {'aciertos': aciertos, 'fallos': fallos, 'tasa_aciertos': aciertos / total if total else 0.0,
+            **planificador.resumen()}
+
+def get_league_seasons(api_key, league_id, limit=None, forzar=False):
     params = {"id": league_id}
-    response = requests.get(url, headers=headers, params=params)
+    response = _get("leagues", api_key, params, TTL_LIGAS, forzar=forzar)
 
     if response.status_code != 200:
         return []
@@ -18,11 +154,9 @@ def get_league_seasons(api_key, league_id, limit=None):
     años = sorted([s['year'] for s in seasons], reverse=True)
     return años if limit is None else años[:limit]
 
-def get_teams_by_league(api_key, league_id, season):
-    url = "https://v3.football.api-sports.io/teams"
-    headers = {'x-apisports-key': api_key}
+def get_teams_by_league(api_key, league_id, season, forzar=False):
     params = {'league': league_id, 'season': season}
-    response = requests.get(url, headers=headers, params=params)
+    response = _get("teams", api_key, params, TTL_EQUIPOS, forzar=forzar)
 
     if response.status_code != 200:
         return {}
@@ -34,10 +168,8 @@ def get_teams_by_league(api_key, league_id, season):
     }
 
 def get_h2h_data(api_key, team1_id, team2_id):
-    url = "https://v3.football.api-sports.io/fixtures/headtohead"
-    headers = {'x-apisports-key': api_key}
     params = {'h2h': f"{team1_id}-{team2_id}"}
-    response = requests.get(url, headers=headers, params=params)
+    response = _get("fixtures/headtohead", api_key, params, TTL_H2H)
 
     if response.status_code != 200:
         return []
@@ -45,64 +177,54 @@ def get_h2h_data(api_key, team1_id, team2_id):
     return response.json().get('response', [])
 
 def get_team_fixtures(api_key, league_id, season, team_id):
-    url = "https://v3.football.api-sports.io/fixtures"
-    headers = {'x-apisports-key': api_key}
     params = {'league': league_id, 'season': season, 'team': team_id}
-    response = requests.get(url, headers=headers, params=params)
+    response = _get("fixtures", api_key, params, ttl_fixtures(season))
 
     if response.status_code != 200:
         return []
 
     return response.json().get('response', [])
 
-def agrupar_partidos_por_año(partidos, años=5):
-    hoy = datetime.today()
-    anio_actual = hoy.year
-    min_anio = anio_actual - años + 1
-    partidos_por_anio = {}
-
-    for p in partidos:
-        fecha = p['fixture']['date'][:10]
-        anio = int(fecha[:4])
-        if anio >= min_anio:
-            partidos_por_anio.setdefault(anio, []).append(p)
+def get_team_fixtures_por_temporada(api_key, league_id, temporadas, team_id, max_workers=None, obtener=None,
+                                    avisar_espera=False):
+    # Lanza las peticiones de todas las temporadas a la vez (con un límite de
+    # concurrencia) y va devolviendo (temporada, partidos) en el orden pedido,
+    # de modo que la primera temporada está disponible tras un solo viaje de ida
+    # y vuelta aunque haya que pedir diez o quince
+    # `obtener` permite cambiar la fuente de cada temporada (p. ej. el almacén local)
+    # Con `avisar_espera` se devuelve además si la siguiente temporada aún no ha
+    # llegado, para que quien pinta solo lo haga cuando de verdad va a esperar
+    temporadas = list(temporadas)
+    obtener = obtener or get_team_fixtures
+    if not temporadas:
+        return
+    max_workers = max_workers or MAX_PETICIONES_CONCURRENTES
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, len(temporadas)))
+    try:
+        # Cada tarea corre en el contexto de quien la lanza, para que sus tramos
+        # de tiempo se apunten en la traza de esa ejecución
+        futuros = [(t, pool.submit(contextvars.copy_context().run, obtener, api_key, league_id, t, team_id))
+                   for t in temporadas]
+        for i, (temporada, futuro) in enumerate(futuros):
+            if avisar_espera:
+                esperando = i + 1 < len(futuros) and not futuros[i + 1][1].done()
+                yield temporada, futuro.result(), esperando
+            else:
+                yield temporada, futuro.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
 
-    return partidos_por_anio
+def agrupar_partidos_por_año(partidos, años=5):
+    # pandas y numpy se importan al usarse: elegir liga y equipo no los necesita
+    import numpy as np
+    import pandas as pd
+    from utils.tabla_partidos import normalizar_partidos
+    min_anio = datetime.today().year - años + 1
+    anios = normalizar_partidos(partidos)['fecha'].dt.year.to_numpy()
+    seleccion = np.flatnonzero(anios >= min_anio)
+    grupos = pd.Series(seleccion).groupby(anios[seleccion], sort=False)
+    return {int(anio): [partidos[i] for i in indices] for anio, indices in grupos}
 
 def calcular_resumen(partidos, equipo1, equipo2):
-    resumen = {
-        equipo1: {'victorias': 0, 'empates': 0, 'derrotas': 0, 'goles_favor': 0, 'goles_contra': 0},
-        equipo2: {'victorias': 0, 'empates': 0, 'derrotas': 0, 'goles_favor': 0, 'goles_contra': 0}
-    }
-
-    for p in partidos:
-        home = p['teams']['home']['name']
-        away = p['teams']['away']['name']
-        g_home = p['goals']['home']
-        g_away = p['goals']['away']
-
-        if g_home is None or g_away is None:
-            continue
-
-        if g_home == g_away:
-            resumen[equipo1]['empates'] += 1
-            resumen[equipo2]['empates'] += 1
-        elif (home == equipo1 and g_home > g_away) or (away == equipo1 and g_away > g_home):
-            resumen[equipo1]['victorias'] += 1
-            resumen[equipo2]['derrotas'] += 1
-        else:
-            resumen[equipo2]['victorias'] += 1
-            resumen[equipo1]['derrotas'] += 1
-
-        if home == equipo1:
-            resumen[equipo1]['goles_favor'] += g_home
-            resumen[equipo1]['goles_contra'] += g_away
-            resumen[equipo2]['goles_favor'] += g_away
-            resumen[equipo2]['goles_contra'] += g_home
-        else:
-            resumen[equipo1]['goles_favor'] += g_away
-            resumen[equipo1]['goles_contra'] += g_home
-            resumen[equipo2]['goles_favor'] += g_home
-            resumen[equipo2]['goles_contra'] += g_away
-
-    return resumen
\ No newline at end of file
+    from utils.tabla_partidos import normalizar_partidos, resumen_enfrentamientos
+    return resumen_enfrentamientos(normalizar_partidos(partidos), equipo1, equipo2)
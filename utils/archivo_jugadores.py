@@ -0,0 +1,180 @@
+import argparse
+import gc
+import hashlib
+import os
+import time
+from functools import lru_cache
+from urllib.parse import unquote
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from utils.data_cache import cargar_excel_columnar, huella_fichero, tiempos_carga
+from utils.dataset import (COLUMNAS_CATEGORICAS, RUTA_DATOS, RUTA_METRICAS, DatosJugadores,
+                           cargar_dataset)
+from utils.metricas import tramo
+
+# Archivo de jugadores en Parquet particionado por temporada y competición
+# (data/jugadores/temporada=2023-2024/Competicion=La_Liga/parte-0.parquet).
+# Cada carga lee solo las particiones y columnas de la selección actual; si no
+# existe el archivo se usa DatosUnif.xlsx como única temporada.
+RUTA_ARCHIVO = "data/jugadores"
+TEMPORADA_EXCEL = "2023/2024"
+
+PARTICIONADO = ds.partitioning(pa.schema([('temporada', pa.string()), ('Competicion', pa.string())]),
+                               flavor='hive')
+
+# Columnas de las fichas de jugador (selectores y cabecera del radar)
+COLUMNAS_FICHA = COLUMNAS_CATEGORICAS + ['Partidos']
+
+
+def _carpeta(temporada):
+    # "2023/2024" -> "2023-2024": la barra no puede ir en un nombre de carpeta
+    return temporada.replace('/', '-')
+
+
+def _subcarpetas(ruta, clave):
+    if not os.path.isdir(ruta):
+        return []
+    prefijo = f"{clave}="
+    return [unquote(nombre[len(prefijo):]) for nombre in os.listdir(ruta)
+            if nombre.startswith(prefijo) and os.path.isdir(os.path.join(ruta, nombre))]
+
+
+def hay_archivo(ruta=RUTA_ARCHIVO):
+    return bool(_subcarpetas(ruta, 'temporada'))
+
+
+def temporadas(ruta=RUTA_ARCHIVO):
+    # De la más reciente a la más antigua, sin abrir ningún fichero
+    if not hay_archivo(ruta):
+        return [TEMPORADA_EXCEL]
+    return sorted((t.replace('-', '/') for t in _subcarpetas(ruta, 'temporada')), reverse=True)
+
+
+def competiciones(temporada, ruta=RUTA_ARCHIVO):
+    if not hay_archivo(ruta):
+        return _dataset_excel().competiciones()
+    return sorted(_subcarpetas(os.path.join(ruta, f"temporada={_carpeta(temporada)}"), 'Competicion'))
+
+
+@lru_cache(maxsize=1)
+def _cargar_excel(huellas):
+    return cargar_dataset()
+
+
+def _dataset_excel():
+    # Sin archivo particionado: el dataset completo del Excel, uno por proceso
+    # (se vuelve a construir solo si cambia alguno de los dos Excel)
+    return _cargar_excel((huella_fichero(RUTA_DATOS), huella_fichero(RUTA_METRICAS)))
+
+
+def _filtro(temporada, competicion=None, posicion=None):
+    # temporada y competición podan particiones; la posición se evalúa con las
+    # estadísticas de cada grupo de filas (los ficheros van ordenados por Pos)
+    filtro = ds.field('temporada') == _carpeta(temporada)
+    if competicion is not None:
+        filtro &= ds.field('Competicion') == competicion
+    if posicion is not None:
+        filtro &= ds.field('Pos') == posicion
+    return filtro
+
+
+def _huella_ficheros(rutas):
+    sha = hashlib.sha256()
+    for ruta in sorted(rutas):
+        stat = os.stat(ruta)
+        sha.update(f"{ruta}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+    return sha.hexdigest()
+
+
+def huella_temporada(temporada, ruta=RUTA_ARCHIVO, ruta_metricas=RUTA_METRICAS):
+    # Huella de lo que alimenta una temporada sin leer ningún dato: ruta,
+    # tamaño y mtime de sus particiones (o el hash de DatosUnif.xlsx sin
+    # archivo) más el Excel de métricas. Cambia al publicar de nuevo la
+    # temporada o al editar los Excel.
+    if not hay_archivo(ruta):
+        return f"{huella_fichero(RUTA_DATOS)[:16]}-{huella_fichero(ruta_metricas)[:16]}"
+    carpeta = os.path.join(ruta, f"temporada={_carpeta(temporada)}")
+    ficheros = [os.path.join(raiz, nombre) for raiz, _, nombres in os.walk(carpeta)
+                for nombre in nombres if nombre.endswith('.parquet')]
+    return f"{_huella_ficheros(ficheros)[:16]}-{huella_fichero(ruta_metricas)[:16]}"
+
+
+@tramo('cargar_particiones')
+def leer_particiones(temporada, competicion=None, posicion=None, columnas=None, ruta=RUTA_ARCHIVO):
+    # DataFrame con las filas y columnas pedidas y la huella de los ficheros leídos
+    inicio = time.perf_counter()
+    archivo = ds.dataset(ruta, format='parquet', partitioning=PARTICIONADO)
+    filtro = _filtro(temporada, competicion, posicion)
+    if columnas is not None:
+        columnas = [col for col in columnas if col in archivo.schema.names]
+    tabla = archivo.to_table(columns=columnas, filter=filtro)
+    ficheros = [fragmento.path for fragmento in archivo.get_fragments(filter=filtro)]
+
+    tiempos_carga['jugadores'] = {
+        'segundos': time.perf_counter() - inicio,
+        'origen': 'parquet',
+        'filas': tabla.num_rows,
+        'columnas': tabla.num_columns,
+        'ficheros': len(ficheros),
+    }
+    return tabla.to_pandas(), _huella_ficheros(ficheros)
+
+
+def cargar_fichas(temporada, competicion, ruta=RUTA_ARCHIVO):
+    # Solo columnas descriptivas de una competición: alimenta los selectores
+    if not hay_archivo(ruta):
+        return _dataset_excel()
+    df, huella = leer_particiones(temporada, competicion, columnas=COLUMNAS_FICHA, ruta=ruta)
+    return DatosJugadores(df, cargar_excel_columnar(RUTA_METRICAS), f"{_carpeta(temporada)}-{huella[:16]}",
+                          posiciones=[], fuente=f"archivo de jugadores, temporada {temporada}")
+
+
+def cargar_posicion(temporada, posicion, ruta=RUTA_ARCHIVO, ruta_metricas=RUTA_METRICAS):
+    # Jugadores de una posición en todas las competiciones de la temporada, con
+    # las columnas descriptivas y las métricas del radar de esa posición
+    if not hay_archivo(ruta):
+        return _dataset_excel()
+    metricas_por_posicion = cargar_excel_columnar(ruta_metricas)
+    metricas = metricas_por_posicion[posicion].dropna().tolist()
+    df, huella = leer_particiones(temporada, posicion=posicion, columnas=COLUMNAS_FICHA + metricas, ruta=ruta)
+    version = f"{_carpeta(temporada)}-{huella[:16]}-{huella_fichero(ruta_metricas)[:16]}"
+    return DatosJugadores(df, metricas_por_posicion, version, posiciones=[posicion],
+                          fuente=f"archivo de jugadores, temporada {temporada}")
+
+
+def escribir_temporada(df, temporada, destino=RUTA_ARCHIVO):
+    # Escribe (o sustituye) las particiones de una temporada. Las métricas se
+    # guardan como float32 para que todas las temporadas compartan esquema.
+    columnas = {
+        col: df[col].astype('string') if col in COLUMNAS_CATEGORICAS
+        else pd.to_numeric(df[col], errors='coerce').astype(np.float32)
+        for col in df.columns
+    }
+    columnas['temporada'] = _carpeta(temporada)
+    df = pd.DataFrame(columnas).sort_values(['Competicion', 'Pos', 'Partidos'], kind='stable')
+    ds.write_dataset(pa.Table.from_pandas(df, preserve_index=False), destino, format='parquet',
+                     partitioning=PARTICIONADO, basename_template='parte-{i}.parquet',
+                     existing_data_behavior='delete_matching')
+    # Los ciclos que deja la escritura deben recogerse ahora: si el recolector
+    # salta al cerrar el intérprete desde un hilo de Arrow, el proceso aborta
+    gc.collect()
+    return len(df)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Añade un Excel de jugadores al archivo particionado")
+    parser.add_argument('--origen', default=RUTA_DATOS)
+    parser.add_argument('--temporada', default=TEMPORADA_EXCEL, help="p. ej. 2023/2024")
+    parser.add_argument('--destino', default=RUTA_ARCHIVO)
+    args = parser.parse_args(argv)
+
+    total = escribir_temporada(cargar_excel_columnar(args.origen), args.temporada, args.destino)
+    print(f"{total} jugadores de la temporada {args.temporada} escritos en {os.path.normpath(args.destino)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+import importlib
+import os
+import threading
+import time
+
+# Módulos que las páginas importan al renderizar por primera vez. Tras el
+# login se pueden importar en segundo plano mientras el usuario elige sección,
+# para que la primera página no pague el coste de matplotlib/seaborn/mplsoccer.
+MODULOS_PESADOS = [
+    'utils.dataset',
+    'utils.archivo_jugadores',
+    'utils.radar',
+    'utils.api_utils',
+    'requests_cache',
+    'utils.tabla_partidos',
+    'matplotlib.pyplot',
+]
+
+PRECALENTAR = os.environ.get('APP_PRECALENTAR', '1') == '1'
+
+# Segundos de importación de cada módulo en el precalentamiento
+tiempos_importacion = {}
+
+_lock = threading.Lock()
+_hilo = None
+
+
+def _importar(modulos):
+    for modulo in modulos:
+        inicio = time.perf_counter()
+        try:
+            importlib.import_module(modulo)
+        except ImportError:
+            continue
+        tiempos_importacion[modulo] = time.perf_counter() - inicio
+
+
+def precalentar(modulos=MODULOS_PESADOS):
+    # Lanza (una sola vez por proceso) el hilo que importa los módulos pesados
+    global _hilo
+    if not PRECALENTAR:
+        return None
+    with _lock:
+        if _hilo is None:
+            _hilo = threading.Thread(target=_importar, args=(list(modulos),), name='precalentar', daemon=True)
+            _hilo.start()
+    return _hilo
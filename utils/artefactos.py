@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import threading
+
+# Almacén de radares ya generados, direccionado por contenido: el nombre de
+# cada fichero es el hash de todo lo que determina la imagen, así que un radar
+# repetido se sirve desde disco sin volver a pasar por matplotlib.
+DIR_ARTEFACTOS = os.path.join(os.path.dirname(__file__), '..', 'output', 'radares')
+
+# Presupuesto de disco; al superarlo se borran los menos usados recientemente
+# hasta bajar al 90 %, para no recorrer el almacén en cada escritura siguiente
+PRESUPUESTO_MB = float(os.environ.get('RADAR_CACHE_MB', '200'))
+MARGEN_EXPULSION = 0.9
+
+estadisticas = {'aciertos': 0, 'fallos': 0, 'expulsados': 0}
+_lock = threading.Lock()
+
+# Bytes ocupados por el almacén según el último recorrido más lo escrito
+# después desde este proceso (None: aún no se ha recorrido)
+_ocupado = None
+
+
+def clave_artefacto(jugador, posicion, partidos_min, metricas, version, formato, dpi, etiquetas=()):
+    contenido = json.dumps({
+        'jugador': jugador,
+        'posicion': posicion,
+        'partidos_min': int(partidos_min),
+        'metricas': list(metricas),
+        'etiquetas': list(etiquetas),
+        'version': version,
+        'formato': formato,
+        'dpi': int(dpi),
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def _ruta(clave, formato):
+    return os.path.join(DIR_ARTEFACTOS, clave[:2], f"{clave}.{formato}")
+
+
+def leer_artefacto(clave, formato):
+    ruta = _ruta(clave, formato)
+    try:
+        with open(ruta, 'rb') as f:
+            datos = f.read()
+    except FileNotFoundError:
+        with _lock:
+            estadisticas['fallos'] += 1
+        return None
+    # La fecha de modificación hace de marca de "último uso" para el LRU.
+    # Otra sesión puede haberlo expulsado justo después de leerlo: los bytes
+    # ya leídos siguen sirviendo
+    try:
+        os.utime(ruta)
+    except FileNotFoundError:
+        pass
+    with _lock:
+        estadisticas['aciertos'] += 1
+    return datos
+
+
+def guardar_artefacto(clave, formato, datos):
+    ruta = _ruta(clave, formato)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporal, 'wb') as f:
+        f.write(datos)
+    os.replace(temporal, ruta)
+    _aplicar_presupuesto(len(datos))
+
+
+def obtener_artefacto(clave, formato, generar):
+    # Devuelve el artefacto guardado o lo genera con `generar()` y lo guarda
+    datos = leer_artefacto(clave, formato)
+    if datos is None:
+        datos = generar()
+        guardar_artefacto(clave, formato, datos)
+    return datos
+
+
+def _aplicar_presupuesto(escritos=0):
+    # Solo se recorre el almacén cuando el total conocido supera el presupuesto
+    global _ocupado
+    limite = PRESUPUESTO_MB * 1024 * 1024
+    with _lock:
+        if _ocupado is not None:
+            _ocupado += escritos
+            if _ocupado <= limite:
+                return
+
+    ficheros = []
+    for raiz, _, nombres in os.walk(DIR_ARTEFACTOS):
+        for nombre in nombres:
+            if nombre.endswith('.tmp'):
+                continue
+            ruta = os.path.join(raiz, nombre)
+            try:
+                stat = os.stat(ruta)
+            except FileNotFoundError:
+                continue
+            ficheros.append((stat.st_mtime, stat.st_size, ruta))
+
+    total = sum(tamano for _, tamano, _ in ficheros)
+    objetivo = limite * MARGEN_EXPULSION if total > limite else limite
+    for _, tamano, ruta in sorted(ficheros):
+        if total <= objetivo:
+            break
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            continue
+        total -= tamano
+        with _lock:
+            estadisticas['expulsados'] += 1
+    with _lock:
+        _ocupado = total
+
+
+def resumen_estadisticas():
+    with _lock:
+        aciertos, fallos = estadisticas['aciertos'], estadisticas['fallos']
+        expulsados = estadisticas['expulsados']
+    total = aciertos + fallos
+    tasa = aciertos / total if total else 0.0
+    return {'aciertos': aciertos, 'fallos': fallos, 'expulsados': expulsados, 'tasa_aciertos': tasa}
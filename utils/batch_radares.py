@@ -0,0 +1,177 @@
+# Generación de radares por lotes, sin Streamlit, para informes de un equipo,
+# una competición o una posición completa.
+#
+#   python -m utils.batch_radares --competicion La_Liga --equipo Barcelona --formato pdf
+#   python -m utils.batch_radares --posicion FW --partidos-min 10 --workers 4
+#   python -m utils.batch_radares --equipo Barcelona --informe output/dossier_barcelona.pdf
+#   python -m utils.batch_radares --temporada 2022/2023 --competicion La_Liga
+#
+# Los datos se leen igual que en la página de jugadores (utils.archivo_jugadores):
+# del archivo particionado si existe y, si no, de DatosUnif.xlsx.
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+
+from utils.archivo_jugadores import cargar_fichas, cargar_posicion, temporadas
+from utils.dataset import cargar_nombres_visuales
+from utils.pdf_export import DPI_INFORME, generar_informe_pdf
+from utils.radar import DPI_PANTALLA, DPI_RADAR, FORMATOS_EXPORTACION, generar_radar
+
+# Estado de cada proceso del pool: cada posición de la temporada se carga una
+# vez por proceso (la misma carga que hace la página) y los fondos por
+# posición se reutilizan entre jugadores
+_temporada = None
+_posiciones = {}
+_nombres = None
+
+
+def _iniciar_worker(temporada):
+    global _temporada, _nombres
+    _temporada = temporada
+    _nombres = cargar_nombres_visuales()
+
+
+def _datos_posicion(temporada, posicion):
+    if (temporada, posicion) not in _posiciones:
+        _posiciones[(temporada, posicion)] = cargar_posicion(temporada, posicion)
+    return _posiciones[(temporada, posicion)]
+
+
+def seleccionar_jugadores(fichas, competicion=None, equipo=None, posicion=None):
+    # (posición, competición, equipo, jugador) de los que cumplen los filtros,
+    # agrupados por posición para que cada proceso encadene jugadores que
+    # comparten datos y fondo
+    jugadores = set()
+    for comp, equipos in fichas.indice.items():
+        if competicion and comp != competicion:
+            continue
+        for eq, filas_equipo in equipos.items():
+            if equipo and eq != equipo:
+                continue
+            for nombre, filas_jugador in filas_equipo.items():
+                for fila in filas_jugador:
+                    pos = str(fichas.info['Pos'].iat[int(fila)])
+                    if not posicion or pos == posicion:
+                        jugadores.add((pos, comp, eq, nombre))
+    return sorted(jugadores)
+
+
+def _nombre_fichero(ficha, extension):
+    base = f"radar_{ficha['Player']}_{ficha['Squad']}".replace(' ', '_').replace('/', '-')
+    return f"{base}.{extension}"
+
+
+def renderizar_jugador(jugador, partidos_min, formato, dpi, salida, temporada=None, nombres=None):
+    posicion, competicion, equipo, nombre = jugador
+    datos = _datos_posicion(temporada or _temporada, posicion)
+    nombres = nombres or _nombres
+    bloque = datos.bloques.get(posicion)
+    # Sin archivo particionado `datos` es el Excel completo: se descartan
+    # homónimos del mismo equipo que jueguen en otra posición
+    filas = [int(f) for f in datos.filas_jugador(competicion, equipo, nombre)
+             if datos.info['Pos'].iat[int(f)] == posicion]
+    if bloque is None or not filas:
+        return None
+    fila = filas[0]
+    ficha = datos.ficha(fila)
+    valores_jugador = bloque.valores_jugador(fila, partidos_min)
+    if valores_jugador is None:
+        return None
+    _, valores_comparables = bloque.seleccionar(partidos_min)
+    # Fuera del almacén de artefactos: el resultado del lote son los ficheros
+    # de `salida`, y guardarlo también allí expulsaría los radares de la app
+    contenido = generar_radar(ficha, partidos_min, datos.version, bloque.metricas, valores_comparables,
+                              valores_jugador, nombres, formato=formato, dpi=dpi, fuente=datos.fuente,
+                              almacen=False)
+    extension = FORMATOS_EXPORTACION.get(formato, (formato, None))[0]
+    ruta = os.path.join(salida, _nombre_fichero(ficha, extension))
+    with open(ruta, 'wb') as f:
+        f.write(contenido)
+    return str(ficha['Player']), ruta
+
+
+def generar_radares(competicion=None, equipo=None, posicion=None, partidos_min=5, formato='png',
+                    dpi=None, workers=None, salida='output/lote', progreso=print, informe=None,
+                    dpi_informe=DPI_INFORME, temporada=None):
+    # Renderiza todos los jugadores que cumplen los filtros y devuelve un resumen
+    # con las rutas generadas, los omitidos y el rendimiento en jugadores/s.
+    # Sin `temporada` se usa la más reciente del archivo.
+    # Con `informe` además se juntan todos los radares en un único PDF.
+    dpi = dpi or (DPI_PANTALLA if formato == 'webp' else DPI_RADAR)
+    workers = os.cpu_count() if workers is None else workers
+    temporada = temporada or temporadas()[0]
+    os.makedirs(salida, exist_ok=True)
+
+    # Solo las columnas descriptivas para elegir jugadores; las métricas se
+    # leen por posición en cada proceso
+    jugadores = seleccionar_jugadores(cargar_fichas(temporada, competicion), competicion, equipo, posicion)
+    total = len(jugadores)
+    generados = []
+    inicio = time.perf_counter()
+
+    def informar(hechos, resultado):
+        if resultado:
+            generados.append(resultado)
+        if progreso:
+            ritmo = hechos / (time.perf_counter() - inicio)
+            estado = os.path.basename(resultado[1]) if resultado else "omitido (partidos o métricas)"
+            progreso(f"[{hechos}/{total}] {estado} · {ritmo:.2f} jugadores/s")
+
+    if workers > 1 and total > 1:
+        contexto = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=contexto, initializer=_iniciar_worker,
+                                 initargs=(temporada,)) as pool:
+            futuros = [pool.submit(renderizar_jugador, jugador, partidos_min, formato, dpi, salida)
+                       for jugador in jugadores]
+            for hechos, futuro in enumerate(as_completed(futuros), start=1):
+                informar(hechos, futuro.result())
+    else:
+        nombres = cargar_nombres_visuales()
+        for hechos, jugador in enumerate(jugadores, start=1):
+            informar(hechos, renderizar_jugador(jugador, partidos_min, formato, dpi, salida, temporada=temporada,
+                                                nombres=nombres))
+
+    segundos = time.perf_counter() - inicio
+
+    if informe:
+        os.makedirs(os.path.dirname(informe) or '.', exist_ok=True)
+        with open(informe, 'wb') as f:
+            f.write(generar_informe_pdf(sorted(generados), dpi_objetivo=dpi_informe))
+
+    return {
+        'generados': [ruta for _, ruta in generados],
+        'omitidos': total - len(generados),
+        'segundos': segundos,
+        'jugadores_por_segundo': len(generados) / segundos if segundos else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera radares de todos los jugadores que cumplen los filtros")
+    parser.add_argument('--temporada', help="p. ej. 2023/2024 (por defecto, la más reciente del archivo)")
+    parser.add_argument('--competicion')
+    parser.add_argument('--equipo')
+    parser.add_argument('--posicion')
+    parser.add_argument('--partidos-min', type=int, default=5)
+    parser.add_argument('--formato', default='png', choices=sorted(FORMATOS_EXPORTACION) + ['webp'])
+    parser.add_argument('--dpi', type=int)
+    parser.add_argument('--workers', type=int, help="procesos (por defecto, uno por núcleo; 1 = en serie)")
+    parser.add_argument('--salida', default='output/lote')
+    parser.add_argument('--informe', help="ruta de un PDF con todos los radares (requiere --formato png)")
+    parser.add_argument('--dpi-informe', type=int, default=DPI_INFORME)
+    args = parser.parse_args()
+
+    if args.informe and args.formato != 'png':
+        parser.error("--informe necesita --formato png")
+
+    resumen = generar_radares(args.competicion, args.equipo, args.posicion, args.partidos_min,
+                              args.formato, args.dpi, args.workers, args.salida,
+                              informe=args.informe, dpi_informe=args.dpi_informe, temporada=args.temporada)
+    print(f"{len(resumen['generados'])} radares en {resumen['segundos']:.1f} s "
+          f"({resumen['jugadores_por_segundo']:.2f} jugadores/s), {resumen['omitidos']} omitidos")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+import argparse
+import functools
+import hmac
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+
+# Credenciales con la contraseña en argon2 (usuario -> hash). Mientras no se
+# haya migrado se sigue leyendo el Excel antiguo con las contraseñas en claro.
+RUTA_CREDENCIALES = os.path.join(os.path.dirname(__file__), '..', 'data', 'credenciales.json')
+RUTA_USUARIOS = os.path.join(os.path.dirname(__file__), '..', 'data', 'usuarios.xlsx')
+
+# argon2 reserva 64 MB por verificación: pocas a la vez aunque lleguen muchos logins
+VERIFICACIONES_CONCURRENTES = int(os.environ.get('LOGIN_VERIFICACIONES', '2'))
+
+_hasher = PasswordHasher()
+_pool = ThreadPoolExecutor(max_workers=VERIFICACIONES_CONCURRENTES, thread_name_prefix='login')
+_lock = threading.Lock()
+_indice = {'ruta': None, 'mtime_ns': None, 'hashes': False, 'usuarios': {}}
+
+
+@functools.lru_cache(maxsize=1)
+def _hash_ficticio():
+    # Hash de relleno para que un usuario inexistente tarde lo mismo que uno real
+    return _hasher.hash('usuario-inexistente')
+
+
+def leer_usuarios_excel(ruta=RUTA_USUARIOS):
+    if not os.path.exists(ruta):
+        raise FileNotFoundError(f"El archivo de usuarios no se encontró en: {ruta}")
+    # pandas solo hace falta sin migrar (o al migrar): no entra en el arranque
+    import pandas as pd
+    df = pd.read_excel(ruta, dtype=str)
+    return {
+        str(usuario).strip(): str(clave).strip()
+        for usuario, clave in zip(df['usuario'], df['contraseña'])
+        if pd.notna(usuario) and pd.notna(clave)
+    }
+
+
+def _fuente():
+    if os.path.exists(RUTA_CREDENCIALES):
+        return RUTA_CREDENCIALES, True
+    return RUTA_USUARIOS, False
+
+
+def indice_usuarios():
+    # Índice usuario -> credencial, que solo se vuelve a leer si cambia el fichero
+    ruta, hashes = _fuente()
+    mtime_ns = os.stat(ruta).st_mtime_ns
+    with _lock:
+        if _indice['ruta'] != ruta or _indice['mtime_ns'] != mtime_ns:
+            if hashes:
+                with open(ruta, encoding='utf-8') as f:
+                    usuarios = json.load(f)
+            else:
+                usuarios = leer_usuarios_excel(ruta)
+            _indice.update(ruta=ruta, mtime_ns=mtime_ns, hashes=hashes, usuarios=usuarios)
+        return _indice['usuarios'], _indice['hashes']
+
+
+def _verificar(credencial, password, hashes):
+    if not hashes:
+        return hmac.compare_digest(credencial.encode('utf-8'), password.encode('utf-8'))
+    try:
+        return _hasher.verify(credencial, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+
+def verificar_usuario(login, password):
+    # La comprobación de argon2 se hace en el pool de verificación (libera el
+    # GIL), así una ráfaga de logins no bloquea al resto de sesiones
+    usuarios, hashes = indice_usuarios()
+    credencial = usuarios.get(login.strip())
+    if credencial is None:
+        if hashes:
+            _pool.submit(_verificar, _hash_ficticio(), password.strip(), True).result()
+        return False
+    return _pool.submit(_verificar, credencial, password.strip(), hashes).result()
+
+
+def migrar(origen=RUTA_USUARIOS, destino=RUTA_CREDENCIALES):
+    # Convierte el Excel de usuarios en el fichero de credenciales con argon2
+    usuarios = leer_usuarios_excel(origen)
+    hashes = {usuario: _hasher.hash(clave) for usuario, clave in usuarios.items()}
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporal = f"{destino}.{os.getpid()}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(hashes, f, ensure_ascii=False, indent=2)
+    os.replace(temporal, destino)
+    return len(hashes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migra usuarios.xlsx a credenciales con contraseñas argon2")
+    parser.add_argument('--origen', default=RUTA_USUARIOS)
+    parser.add_argument('--destino', default=RUTA_CREDENCIALES)
+    args = parser.parse_args(argv)
+
+    total = migrar(args.origen, args.destino)
+    print(f"{total} usuarios migrados a {os.path.normpath(args.destino)}")
+    print("Las contraseñas en claro siguen en el Excel de origen: bórralo una vez comprobado el acceso.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+from utils.metricas import tramo
+
+# Directorio donde se guardan las copias columnares (Arrow IPC) de los Excel
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', '.cache')
+
+# Último tiempo de carga por fichero, para poder mostrarlo en la app
+tiempos_carga = {}
+
+
+def _hash_fichero(ruta):
+    sha = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def _nombre_cache(ruta):
+    # Nombre base de los ficheros de caché de un Excel: incluye un hash de la
+    # ruta absoluta para que dos Excel con el mismo nombre en carpetas
+    # distintas no compartan manifiesto ni copias Arrow
+    nombre = os.path.splitext(os.path.basename(ruta))[0]
+    ruta_hash = hashlib.sha256(os.path.abspath(ruta).encode('utf-8')).hexdigest()
+    return f"{nombre}-{ruta_hash[:12]}"
+
+
+def huella_fichero(ruta):
+    # Devuelve el hash del Excel. Solo se recalcula si cambian mtime o tamaño,
+    # el resto de veces se reutiliza el que quedó apuntado en el manifiesto.
+    stat = os.stat(ruta)
+    manifiesto_path = os.path.join(CACHE_DIR, f"{_nombre_cache(ruta)}.json")
+
+    if os.path.exists(manifiesto_path):
+        with open(manifiesto_path, encoding='utf-8') as f:
+            manifiesto = json.load(f)
+        if manifiesto.get('mtime_ns') == stat.st_mtime_ns and manifiesto.get('size') == stat.st_size:
+            return manifiesto['sha256']
+
+    sha = _hash_fichero(ruta)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    temporal = f"{manifiesto_path}.{os.getpid()}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump({'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': sha}, f)
+    # Igual que las copias Arrow: nadie debe leer un manifiesto a medio escribir
+    os.replace(temporal, manifiesto_path)
+    return sha
+
+
+def _normalizar_objetos(df):
+    # Arrow no admite columnas con tipos mezclados (p. ej. nacionalidades
+    # numéricas en una columna de texto): se pasan a texto respetando los nulos
+    df = df.copy()
+    for col in df.select_dtypes(include='object').columns:
+        df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def _escribir_arrow(df, destino):
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    temporal = f"{destino}.{os.getpid()}.tmp"
+    with pa.OSFile(temporal, 'wb') as sink:
+        with pa.ipc.new_file(sink, tabla.schema) as writer:
+            writer.write_table(tabla)
+    # Renombrado atómico para que otro proceso nunca lea un fichero a medias
+    os.replace(temporal, destino)
+
+
+def _leer_arrow(origen):
+    with pa.memory_map(origen, 'r') as fuente:
+        tabla = pa.ipc.open_file(fuente).read_all()
+    return tabla.to_pandas()
+
+
+def _limpiar_antiguos(base, vigente):
+    # Solo copias del mismo Excel (misma ruta), nunca las de otro homónimo
+    for fichero in os.listdir(CACHE_DIR):
+        if fichero.startswith(f"{base}-") and fichero.endswith('.arrow') and fichero != vigente:
+            try:
+                os.remove(os.path.join(CACHE_DIR, fichero))
+            except OSError:
+                pass
+
+
+@tramo('cargar_excel')
+def cargar_excel_columnar(ruta):
+    # Lee un Excel pasando por su copia Arrow. La primera vez (o cuando cambia
+    # el Excel) se parsea con openpyxl y se convierte; después se mapea en memoria.
+    inicio = time.perf_counter()
+    nombre = os.path.splitext(os.path.basename(ruta))[0]
+    base = _nombre_cache(ruta)
+    sha = huella_fichero(ruta)
+    fichero_arrow = f"{base}-{sha[:16]}.arrow"
+    destino = os.path.join(CACHE_DIR, fichero_arrow)
+
+    if os.path.exists(destino):
+        df = _leer_arrow(destino)
+        origen = 'arrow'
+    else:
+        df = _normalizar_objetos(pd.read_excel(ruta))
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _escribir_arrow(df, destino)
+        _limpiar_antiguos(base, fichero_arrow)
+        origen = 'excel'
+
+    tiempos_carga[nombre] = {
+        'segundos': time.perf_counter() - inicio,
+        'origen': origen,
+        'sha256': sha,
+    }
+    return df
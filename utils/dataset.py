@@ -0,0 +1,185 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.data_cache import cargar_excel_columnar, huella_fichero
+from utils.metricas import tramo
+
+RUTA_DATOS = "data/DatosUnif.xlsx"
+RUTA_METRICAS = "data/metricas_por_posicion.xlsx"
+RUTA_NOMBRES = "data/metricas_nombres.xlsx"
+
+# Columnas descriptivas que se guardan como categorías; el resto son métricas
+COLUMNAS_CATEGORICAS = ['Competicion', 'Squad', 'Pos', 'Player', 'Nacionalidad']
+
+
+class BloqueComparables:
+    # Jugadores de una posición con sus métricas del radar ya limpias (sin
+    # nulos) y ordenados por partidos jugados. Filtrar por el mínimo de
+    # partidos es un searchsorted y devuelve vistas, no copias.
+
+    def __init__(self, posicion, metricas, filas, partidos, matriz):
+        orden = np.argsort(partidos, kind='stable')
+        self.posicion = posicion
+        self.metricas = metricas
+        self.filas = filas[orden]
+        self.partidos = partidos[orden]
+        self.matriz = np.ascontiguousarray(matriz[orden])
+        self.perfiles = self._normalizar(self.matriz)
+        for array in (self.filas, self.partidos, self.matriz, self.perfiles):
+            array.flags.writeable = False
+        self._posicion_fila = {int(fila): i for i, fila in enumerate(self.filas)}
+
+    @staticmethod
+    def _normalizar(matriz):
+        # Z-score de cada métrica sobre toda la posición y norma 1 por fila: el
+        # producto escalar entre dos perfiles es directamente su similitud coseno
+        media = matriz.mean(axis=0, dtype=np.float64)
+        desviacion = matriz.std(axis=0, dtype=np.float64)
+        desviacion[desviacion == 0] = 1
+        z = ((matriz - media) / desviacion).astype(np.float32)
+        normas = np.linalg.norm(z, axis=1, keepdims=True)
+        normas[normas == 0] = 1
+        return np.ascontiguousarray(z / normas)
+
+    def inicio(self, partidos_min):
+        return int(np.searchsorted(self.partidos, partidos_min, side='left'))
+
+    def seleccionar(self, partidos_min):
+        inicio = self.inicio(partidos_min)
+        return self.filas[inicio:], self.matriz[inicio:]
+
+    def valores_jugador(self, fila, partidos_min=0):
+        # Métricas del jugador si forma parte del grupo comparable, si no None
+        i = self._posicion_fila.get(int(fila))
+        if i is None or i < self.inicio(partidos_min):
+            return None
+        return self.matriz[i]
+
+    @tramo('similares')
+    def similares(self, fila, partidos_min=0, k=10):
+        # Los k jugadores de la posición con el perfil más parecido (similitud
+        # coseno) entre los que cumplen el mínimo de partidos. Devuelve
+        # (filas, similitudes) de mayor a menor; vacío si el jugador no está.
+        i = self._posicion_fila.get(int(fila))
+        if i is None:
+            return np.empty(0, dtype=self.filas.dtype), np.empty(0, dtype=np.float32)
+        inicio = self.inicio(partidos_min)
+        similitudes = self.perfiles[inicio:] @ self.perfiles[i]
+        if i >= inicio:
+            similitudes[i - inicio] = -np.inf
+        k = min(k, len(similitudes) - (i >= inicio))
+        if k <= 0:
+            return np.empty(0, dtype=self.filas.dtype), np.empty(0, dtype=np.float32)
+        mejores = np.argpartition(-similitudes, k - 1)[:k]
+        mejores = mejores[np.argsort(-similitudes[mejores], kind='stable')]
+        return self.filas[inicio:][mejores], similitudes[mejores]
+
+
+class DatosJugadores:
+    # Dataset de jugadores compartido por todo el proceso y de solo lectura.
+    # Las columnas descriptivas viven en `info` (categorías + Partidos) y las
+    # métricas en una única matriz float32 bloqueada contra escritura, de modo
+    # que ninguna sesión puede modificarla ni necesita su propia copia.
+
+    def __init__(self, df, metricas_por_posicion, version, posiciones=None, fuente='DatosUnif.xlsx'):
+        self.version = version
+        # Origen que se cita al pie de los radares
+        self.fuente = fuente
+
+        info = pd.DataFrame({col: df[col].astype('category') for col in COLUMNAS_CATEGORICAS if col in df})
+        info['Partidos'] = pd.to_numeric(df['Partidos'], errors='coerce').fillna(0).astype(np.int16)
+        self.info = info
+
+        self.columnas = [col for col in df.columns if col not in COLUMNAS_CATEGORICAS]
+        self._indice_columna = {col: i for i, col in enumerate(self.columnas)}
+        matriz = np.empty((len(df), len(self.columnas)), dtype=np.float32)
+        for i, col in enumerate(self.columnas):
+            matriz[:, i] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float32, na_value=np.nan)
+        matriz.flags.writeable = False
+        self.matriz = matriz
+
+        self._partidos = info['Partidos'].to_numpy()
+        self._partidos.flags.writeable = False
+
+        self.indice = self._construir_indice()
+
+        self.metricas_posicion = {
+            posicion: metricas_por_posicion[posicion].dropna().tolist()
+            for posicion in metricas_por_posicion.columns
+        }
+        # Con `posiciones` solo se construyen esos bloques (cargas parciales que
+        # traen únicamente las métricas de la posición seleccionada)
+        self.bloques = {
+            posicion: self._construir_bloque(posicion, metricas)
+            for posicion, metricas in self.metricas_posicion.items()
+            if posiciones is None or posicion in posiciones
+        }
+
+    def __len__(self):
+        return len(self.info)
+
+    def memoria_bytes(self):
+        return int(self.info.memory_usage(deep=True).sum()) + self.matriz.nbytes
+
+    def indices_metricas(self, metricas):
+        return [self._indice_columna[m] for m in metricas]
+
+    def valores(self, filas, metricas):
+        # Submatriz de las filas y métricas pedidas (la matriz original no se toca)
+        return self.matriz[np.ix_(np.asarray(filas), self.indices_metricas(metricas))]
+
+    def _construir_indice(self):
+        # Índice competición -> equipo -> jugador -> filas, con claves ordenadas,
+        # para que la cascada de selectores sea una búsqueda en diccionario
+        grupos = self.info.groupby(['Competicion', 'Squad', 'Player'], observed=True).indices
+        anidado = {}
+        for (competicion, equipo, jugador), filas in grupos.items():
+            anidado.setdefault(competicion, {}).setdefault(equipo, {})[jugador] = filas
+        return {
+            competicion: {
+                equipo: dict(sorted(jugadores.items()))
+                for equipo, jugadores in sorted(equipos.items())
+            }
+            for competicion, equipos in sorted(anidado.items())
+        }
+
+    def competiciones(self):
+        return list(self.indice)
+
+    def equipos(self, competicion):
+        return list(self.indice.get(competicion, {}))
+
+    def jugadores(self, competicion, equipo):
+        return list(self.indice.get(competicion, {}).get(equipo, {}))
+
+    def filas_jugador(self, competicion, equipo, jugador):
+        return self.indice.get(competicion, {}).get(equipo, {}).get(jugador, np.empty(0, dtype=np.intp))
+
+    @tramo('construir_comparables')
+    def _construir_bloque(self, posicion, metricas):
+        filas = np.flatnonzero(self.info['Pos'].to_numpy() == posicion)
+        matriz = self.valores(filas, metricas)
+        validas = ~np.isnan(matriz).any(axis=1)
+        return BloqueComparables(posicion, metricas, filas[validas], self._partidos[filas[validas]], matriz[validas])
+
+    def ficha(self, fila):
+        # Datos descriptivos de una fila para las cabeceras del radar
+        return {col: self.info[col].iat[fila] for col in self.info.columns}
+
+
+@tramo('cargar_dataset')
+def cargar_dataset(ruta_datos=RUTA_DATOS, ruta_metricas=RUTA_METRICAS):
+    # Construye el dataset fuera de Streamlit (la página lo envuelve en cache_resource).
+    # La versión combina los dos Excel: cambiar las métricas de una posición
+    # también invalida todo lo que se calcula a partir de los bloques
+    version = f"{huella_fichero(ruta_datos)[:16]}-{huella_fichero(ruta_metricas)[:16]}"
+    return DatosJugadores(cargar_excel_columnar(ruta_datos), cargar_excel_columnar(ruta_metricas), version,
+                          fuente=os.path.basename(ruta_datos))
+
+
+@tramo('cargar_nombres_visuales')
+def cargar_nombres_visuales(ruta_nombres=RUTA_NOMBRES):
+    df_nombres = cargar_excel_columnar(ruta_nombres)
+    return dict(zip(df_nombres["columna_original"], df_nombres["nombre_visual"]))
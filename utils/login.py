@@ -1,39 +1,25 @@
 import streamlit as st
 import extra_streamlit_components as stx
 from datetime import datetime, timedelta
-import os
-import pandas as pd
+from utils.credenciales import verificar_usuario
 
-# Inicializar CookieManager
-cookie_manager = stx.CookieManager()
+def crear_cookie_manager():
+    # El CookieManager es un componente: se crea al renderizar el login (una
+    # vez por ejecución del script) y no al importar el módulo
+    st.session_state['_cookie_manager'] = stx.CookieManager()
+    return st.session_state['_cookie_manager']
 
-def cargar_usuarios():
-    # Ruta relativa al archivo usuarios.xlsx
-    file_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'usuarios.xlsx')
-    
-    # Verificar si el archivo existe
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"El archivo de usuarios no se encontró en: {file_path}")
-    
-    # Cargar el archivo Excel
-    df_usuarios = pd.read_excel(file_path)
-    return df_usuarios
+def obtener_cookie_manager():
+    return st.session_state.get('_cookie_manager') or crear_cookie_manager()
 
 def validarUsuario(login, password):
-    # Cargar los usuarios
-    usuarios = cargar_usuarios()
-    
-    # Filtrar los usuarios por el nombre de usuario y la contraseña
-    usuario_data = usuarios[
-        (usuarios['usuario'].str.strip() == login.strip()) &
-        (usuarios['contraseña'].str.strip() == password.strip())
-    ]
-    
-    # Si se encuentra al menos un usuario, devolvemos True (es válido)
-    return not usuario_data.empty
+    # Búsqueda directa en el índice de credenciales (se relee solo si cambia el
+    # fichero) y verificación del hash fuera del hilo de la sesión
+    return verificar_usuario(login, password)
 
 def check_authentication():
     # Verifica si el usuario está autenticado con cookies
+    cookie_manager = obtener_cookie_manager()
     if cookie_manager.get(cookie='authenticated') == 'true':
         st.session_state['authenticated'] = True
         st.session_state['usuario'] = cookie_manager.get(cookie='usuario')
@@ -42,6 +28,7 @@ def check_authentication():
         st.session_state['usuario'] = None
 
 def generarLogin():
+    cookie_manager = crear_cookie_manager()
     check_authentication()
     
     if not st.session_state.get('authenticated', False):
@@ -81,6 +68,7 @@ def generarLogin():
 
 def logout():
     # Eliminar las cookies y limpiar el estado de sesión
+    cookie_manager = obtener_cookie_manager()
     cookie_manager.delete('authenticated', key='delete_auth')
     cookie_manager.delete('usuario', key='delete_user')
 
@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import Histogram, start_http_server
+
+# Tramos de tiempo de las etapas costosas (carga de datos, enjambres,
+# composición del radar, codificación, llamadas a la API). Cada tramo se
+# acumula en un histograma de Prometheus y, si hay una traza activa, se apunta
+# también en ella para el panel de depuración de la ejecución actual.
+DURACION_ETAPAS = Histogram(
+    'app_futbol_etapa_segundos',
+    'Duración de las etapas de la app',
+    ['etapa'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+# Puerto del endpoint /metrics (0 lo desactiva). Solo escucha en local salvo
+# que se indique otra dirección: en un despliegue público no debe quedar
+# expuesto en todas las interfaces sin que nadie lo haya pedido
+METRICAS_PUERTO = int(os.environ.get('METRICAS_PUERTO', '9464'))
+METRICAS_DIRECCION = os.environ.get('METRICAS_DIRECCION', '127.0.0.1')
+
+# Usuarios que pueden abrir el panel de depuración. Vacío por defecto: el
+# panel solo aparece si se indica APP_ADMINS (p. ej. APP_ADMINS=Admin,Lucas)
+ADMINISTRADORES = {u.strip() for u in os.environ.get('APP_ADMINS', '').split(',') if u.strip()}
+
+_traza = ContextVar('traza', default=None)
+_servidor_lock = threading.Lock()
+_servidor = None
+
+
+def iniciar_traza():
+    # Traza nueva para la ejecución actual del script: lista de
+    # (etapa, detalle, segundos) en el orden en que terminan los tramos
+    traza = []
+    _traza.set(traza)
+    return traza
+
+
+@contextmanager
+def tramo(etapa, detalle=None):
+    # Se puede usar con `with tramo(...)` o como decorador `@tramo(...)`
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - inicio
+        DURACION_ETAPAS.labels(etapa=etapa).observe(segundos)
+        traza = _traza.get()
+        if traza is not None:
+            traza.append((etapa, detalle, segundos))
+
+
+def resumen_traza(traza):
+    # Desglose por etapa de una traza: llamadas, total y máximo en ms, de la
+    # etapa más costosa a la que menos
+    etapas = {}
+    for etapa, _, segundos in traza:
+        llamadas, total, maximo = etapas.get(etapa, (0, 0.0, 0.0))
+        etapas[etapa] = (llamadas + 1, total + segundos, max(maximo, segundos))
+    return [
+        {'etapa': etapa, 'llamadas': llamadas, 'total_ms': round(total * 1000, 1), 'max_ms': round(maximo * 1000, 1)}
+        for etapa, (llamadas, total, maximo) in sorted(etapas.items(), key=lambda e: -e[1][1])
+    ]
+
+
+def iniciar_servidor_metricas(puerto=METRICAS_PUERTO, direccion=METRICAS_DIRECCION):
+    # Endpoint HTTP de Prometheus, una vez por proceso. Si el puerto está
+    # ocupado (otro proceso de la app ya lo sirve) se sigue sin él.
+    global _servidor
+    if not puerto:
+        return False
+    with _servidor_lock:
+        if _servidor is None:
+            try:
+                start_http_server(puerto, addr=direccion)
+                _servidor = True
+            except OSError:
+                _servidor = False
+    return _servidor
@@ -1,24 +1,86 @@
 from fpdf import FPDF
+from PIL import Image
+import hashlib
+import io
 import os
+import tempfile
 
-def generar_pdf_resultados(jugador, radar_image_path, pdf_file_name):
+from utils.metricas import tramo
+
+# Resolución con la que se incrustan las imágenes en los informes. Un radar a
+# 300 dpi pesa ~2 MB; reescalado a 150 dpi y en JPEG se queda en unos 150 KB.
+DPI_INFORME = 150
+CALIDAD_JPEG = 85
+ANCHO_IMAGEN_MM = 180
+
+
+def _preparar_imagen(imagen, directorio, dpi_objetivo, calidad, ancho_mm, incrustadas):
+    # Reescala la imagen al ancho que tendrá en la página y la recomprime en
+    # JPEG. FPDF incrusta una sola vez cada ruta, así que las imágenes idénticas
+    # se escriben con el mismo nombre (hash del contenido) y se comparten.
+    if isinstance(imagen, (bytes, bytearray)):
+        contenido = bytes(imagen)
+    else:
+        with open(imagen, 'rb') as f:
+            contenido = f.read()
+
+    huella = hashlib.sha256(contenido).hexdigest()
+    if huella in incrustadas:
+        return incrustadas[huella]
+
+    img = Image.open(io.BytesIO(contenido))
+    if img.mode in ('RGBA', 'LA', 'P'):
+        img = img.convert('RGBA')
+        fondo = Image.new('RGB', img.size, 'white')
+        fondo.paste(img, mask=img.split()[-1])
+        img = fondo
+    else:
+        img = img.convert('RGB')
+
+    ancho_px = int(round(ancho_mm / 25.4 * dpi_objetivo))
+    if img.width > ancho_px:
+        alto_px = int(round(img.height * ancho_px / img.width))
+        img = img.resize((ancho_px, alto_px), Image.LANCZOS)
+
+    ruta = os.path.join(directorio, f"{huella[:32]}.jpg")
+    img.save(ruta, format='JPEG', quality=calidad, optimize=True)
+    incrustadas[huella] = ruta
+    return ruta
+
+
+@tramo('codificar_informe_pdf')
+def generar_informe_pdf(paginas, dpi_objetivo=DPI_INFORME, calidad=CALIDAD_JPEG, ancho_mm=ANCHO_IMAGEN_MM):
+    # Informe de varias páginas (p. ej. el dossier de un equipo) a partir de
+    # pares (jugador, imagen), donde la imagen puede ser una ruta o bytes.
+    # Devuelve el PDF en bytes, sin escribir nada en output/.
     pdf = FPDF()
-    pdf.add_page()
+    incrustadas = {}
+
+    with tempfile.TemporaryDirectory() as directorio:
+        for jugador, imagen in paginas:
+            pdf.add_page()
+
+            # Agregar título (las fuentes base de FPDF solo cubren latin-1)
+            titulo = f"Resumen de {jugador}".encode('latin-1', 'replace').decode('latin-1')
+            pdf.set_font("Arial", "B", 16)
+            pdf.cell(200, 10, txt=titulo, ln=True, align="C")
+            pdf.ln(10)  # Añadir espacio antes de la imagen
 
-    # Agregar título
-    pdf.set_font("Arial", "B", 16)
-    pdf.cell(200, 10, txt=f"Resumen de {jugador}", ln=True, align="C")
-    pdf.ln(10)  # Añadir espacio antes de la imagen
+            ruta = _preparar_imagen(imagen, directorio, dpi_objetivo, calidad, ancho_mm, incrustadas)
+            pdf.image(ruta, x=10, y=pdf.get_y(), w=ancho_mm)
 
-    # Añadir la imagen generada
-    pdf.image(radar_image_path, x=10, y=pdf.get_y(), w=180)  # Ajuste la imagen al PDF
+        # FPDF 1.7 devuelve el documento como str latin-1
+        return pdf.output(dest='S').encode('latin-1')
 
+
+def generar_pdf_resultados(jugador, radar_image_path, pdf_file_name):
     # Guardamos el PDF en el archivo correspondiente
     output_dir = "output"
     os.makedirs(output_dir, exist_ok=True)
-    
+
     # Usamos el nombre que recibimos como argumento para el PDF
     output_path = os.path.join(output_dir, pdf_file_name)
-    pdf.output(output_path)
+    with open(output_path, 'wb') as f:
+        f.write(generar_informe_pdf([(jugador, radar_image_path)]))
 
-    return output_path
\ No newline at end of file
+    return output_path
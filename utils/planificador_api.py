@@ -0,0 +1,190 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+import requests
+
+# Cabeceras con las que api-sports informa de la cuota por minuto
+CABECERA_LIMITE = 'X-RateLimit-Limit'
+CABECERA_RESTANTES = 'X-RateLimit-Remaining'
+
+# Cuota de partida (plan gratuito); se corrige con las cabeceras de cada respuesta
+PETICIONES_POR_MINUTO = int(os.environ.get('API_SPORTS_POR_MINUTO', '10'))
+MAX_REINTENTOS = int(os.environ.get('API_SPORTS_REINTENTOS', '4'))
+ESPERA_BASE = float(os.environ.get('API_SPORTS_ESPERA_BASE', '0.5'))
+ESPERA_MAX = 30.0
+
+CODIGOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+
+def _entero(valor):
+    try:
+        return int(float(valor))
+    except (TypeError, ValueError):
+        return None
+
+
+class CuboTokens:
+    # Cubo de tokens: admite ráfagas de hasta `capacidad` peticiones y se
+    # rellena de forma continua a razón de capacidad/ventana por segundo. Los
+    # tokens pueden quedar en negativo: es la cola de peticiones ya reservadas.
+
+    def __init__(self, por_ventana, ventana=60.0, reloj=time.monotonic):
+        self.ventana = ventana
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._ajustar(por_ventana)
+        self.tokens = float(self.capacidad)
+        self._ultimo = reloj()
+        self._pausa_hasta = 0.0
+
+    def _ajustar(self, por_ventana):
+        self.capacidad = max(1, int(por_ventana))
+        self.tasa = self.capacidad / self.ventana
+
+    def _rellenar(self):
+        ahora = self._reloj()
+        self.tokens = min(self.capacidad, self.tokens + (ahora - self._ultimo) * self.tasa)
+        self._ultimo = ahora
+
+    def reservar(self):
+        # Reserva un token y devuelve los segundos que hay que esperar para usarlo
+        with self._lock:
+            self._rellenar()
+            self.tokens -= 1
+            espera = 0.0 if self.tokens >= 0 else -self.tokens / self.tasa
+            return max(espera, self._pausa_hasta - self._ultimo)
+
+    def pausar(self, segundos):
+        # El servidor ha rechazado por cuota: nadie sale hasta que se renueve,
+        # no solo la petición rechazada
+        with self._lock:
+            self._pausa_hasta = max(self._pausa_hasta, self._reloj() + segundos)
+
+    def pausa_restante(self):
+        with self._lock:
+            return max(0.0, self._pausa_hasta - self._reloj())
+
+    def devolver(self):
+        # La petición no llegó al servidor: no ha gastado cuota
+        with self._lock:
+            self.tokens = min(self.capacidad, self.tokens + 1)
+
+    def actualizar(self, cabeceras):
+        # El servidor manda: si anuncia otra cuota se adopta, y nunca se cree
+        # tener más peticiones disponibles de las que dice que quedan
+        limite = _entero(cabeceras.get(CABECERA_LIMITE))
+        restantes = _entero(cabeceras.get(CABECERA_RESTANTES))
+        with self._lock:
+            self._rellenar()
+            if limite and limite != self.capacidad:
+                self._ajustar(limite)
+            if restantes is not None:
+                self.tokens = min(self.tokens, restantes)
+
+
+def es_rechazo_por_cuota(response):
+    if response.status_code == 429:
+        return True
+    if response.status_code != 200:
+        return False
+    # api-sports también avisa del límite con un 200 y errors.rateLimit
+    try:
+        errores = response.json().get('errors')
+    except ValueError:
+        return False
+    return isinstance(errores, dict) and 'rateLimit' in errores
+
+
+def es_reintentable(response):
+    return response.status_code in CODIGOS_REINTENTABLES or es_rechazo_por_cuota(response)
+
+
+def _retry_after(response):
+    segundos = _entero(response.headers.get('Retry-After'))
+    return max(0, segundos) if segundos is not None else 0
+
+
+class Planificador:
+    # Punto único por el que salen las peticiones reales a la API: respeta la
+    # cuota (cubo de tokens), reintenta 429/5xx con espera exponencial y jitter,
+    # y agrupa peticiones idénticas en curso para que solo viaje una.
+
+    def __init__(self, cubo=None, max_reintentos=MAX_REINTENTOS, espera_base=ESPERA_BASE,
+                 espera_max=ESPERA_MAX, dormir=time.sleep):
+        self.cubo = cubo or CuboTokens(PETICIONES_POR_MINUTO)
+        self.max_reintentos = max_reintentos
+        self.espera_base = espera_base
+        self.espera_max = espera_max
+        self._dormir = dormir
+        self._en_vuelo = {}
+        self._lock = threading.Lock()
+        self.estadisticas = {'peticiones': 0, 'reintentos': 0, 'deduplicadas': 0, 'segundos_espera': 0.0}
+
+    def _esperar(self, segundos):
+        if segundos > 0:
+            with self._lock:
+                self.estadisticas['segundos_espera'] += segundos
+            self._dormir(segundos)
+
+    def _backoff(self, intento):
+        # Jitter completo: evita que los reintentos de varias sesiones coincidan
+        return random.uniform(0, min(self.espera_max, self.espera_base * 2 ** intento))
+
+    def _con_reintentos(self, peticion):
+        for intento in range(self.max_reintentos + 1):
+            self._esperar(self.cubo.reservar())
+            # Si mientras se esperaba turno hubo un rechazo por cuota, se espera a que se renueve
+            self._esperar(self.cubo.pausa_restante())
+            with self._lock:
+                self.estadisticas['peticiones'] += 1
+            try:
+                response = peticion()
+            except (requests.ConnectionError, requests.Timeout):
+                self.cubo.devolver()
+                if intento == self.max_reintentos:
+                    raise
+                espera = self._backoff(intento)
+            else:
+                if not getattr(response, 'from_cache', False):
+                    self.cubo.actualizar(response.headers)
+                if intento == self.max_reintentos or not es_reintentable(response):
+                    return response
+                espera = max(self._backoff(intento), _retry_after(response))
+                if es_rechazo_por_cuota(response):
+                    # Sin Retry-After (200 con errors.rateLimit) no se sabe cuándo
+                    # se renueva la cuota: en el peor caso, una ventana completa
+                    if not response.headers.get('Retry-After'):
+                        espera = max(espera, self.cubo.ventana)
+                    self.cubo.pausar(espera)
+            with self._lock:
+                self.estadisticas['reintentos'] += 1
+            self._esperar(espera)
+
+    def ejecutar(self, clave, peticion):
+        # Si ya hay una petición con la misma clave en curso, se espera a su
+        # resultado en lugar de lanzar otra
+        with self._lock:
+            vuelo = self._en_vuelo.get(clave)
+            lider = vuelo is None
+            if lider:
+                vuelo = self._en_vuelo[clave] = Future()
+            else:
+                self.estadisticas['deduplicadas'] += 1
+        if not lider:
+            return vuelo.result()
+
+        try:
+            vuelo.set_result(self._con_reintentos(peticion))
+        except BaseException as error:
+            vuelo.set_exception(error)
+        finally:
+            with self._lock:
+                del self._en_vuelo[clave]
+        return vuelo.result()
+
+    def resumen(self):
+        with self._lock:
+            return dict(self.estadisticas)
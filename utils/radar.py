@@ -0,0 +1,394 @@
+import io
+import multiprocessing
+import os
+import textwrap as tw
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import matplotlib
+import matplotlib.patheffects as path_effects
+import numpy as np
+import seaborn as sns
+from cachetools import LRUCache
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.transforms import Affine2D
+from mpl_toolkits.axes_grid1 import Divider, Size
+from mpl_toolkits.axisartist import floating_axes
+from mpl_toolkits.axisartist.floating_axes import GridHelperCurveLinear
+from mplsoccer import PyPizza
+from PIL import Image
+
+from utils.artefactos import clave_artefacto, obtener_artefacto
+from utils.metricas import tramo
+
+COLOR_FONDO = '#313332'
+TAMANO_FIGURA = (9, 10.2)
+DPI_RADAR = 300
+DPI_PANTALLA = 100
+
+# Origen de los datos que se cita al pie del radar
+FUENTE_DATOS = "DatosUnif.xlsx"
+
+# Formatos de exportación: (extensión, tipo MIME). El fondo cacheado
+# (enjambres, anillos y etiquetas) es una imagen a 300 dpi, así que el PDF no
+# es vectorial: solo la pizza y la cabecera lo son. No se ofrece SVG porque
+# sería esa misma imagen en base64 dentro de un envoltorio SVG.
+FORMATOS_EXPORTACION = {
+    'png': ('png', 'image/png'),
+    'pdf': ('pdf', 'application/pdf'),
+}
+
+# Cada enjambre (4.5 x 1.5 pulgadas) acaba ocupando ~0.9 veces su tamaño dentro
+# del radar, así que se rasteriza a ese dpi relativo y no a uno fijo
+ESCALA_ENJAMBRE = 0.9
+TAMANO_ENJAMBRE = (4.5, 1.5)
+TAMANO_PUNTO = 7
+
+# 'numpy' usa el beeswarm vectorizado de este módulo; 'seaborn' mantiene el
+# sns.swarmplot original (cuadrático) para poder comparar ambos
+MOTOR_ENJAMBRE = os.environ.get('RADAR_MOTOR_ENJAMBRE', 'numpy')
+
+# Procesos para rasterizar los enjambres en paralelo (0 o 1 = en serie)
+RADAR_WORKERS = int(os.environ.get('RADAR_WORKERS', '0'))
+
+# Presupuesto de memoria para los fondos ya renderizados (imágenes RGBA)
+FONDOS_MB = int(os.environ.get('RADAR_FONDOS_MB', '256'))
+
+# Capa del radar que solo depende del grupo de comparables: enjambres, anillos,
+# etiquetas y textos comunes, ya rasterizada, más los rangos de cada métrica
+Fondo = namedtuple('Fondo', ['imagen', 'ax_mins', 'ax_maxs'])
+
+_fondos = LRUCache(maxsize=FONDOS_MB * 1024 * 1024, getsizeof=lambda fondo: fondo.imagen.nbytes)
+_fondos_lock = threading.Lock()
+
+# Coordenadas del beeswarm por grupo de comparables (no dependen del dpi)
+_coordenadas = LRUCache(maxsize=64)
+_coordenadas_lock = threading.Lock()
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _angulos(num_metrics):
+    theta_mid = np.radians(np.linspace(0, 360, num_metrics+1))[:-1] + np.pi/2
+    theta_mid = [x if x < 2*np.pi else x - 2*np.pi for x in theta_mid]
+    r_base = np.linspace(0.25, 0.25, num_metrics+1)[:-1]
+    x_base = 0.325 + r_base * np.cos(theta_mid)
+    y_base = 0.3 + 0.89 * r_base * np.sin(theta_mid)
+    return theta_mid, x_base, y_base
+
+
+def _caja_ejes_pt():
+    # Ancho y alto en puntos de los ejes de un enjambre con los márgenes por defecto
+    rc = matplotlib.rcParams
+    ancho = TAMANO_ENJAMBRE[0] * 72 * (rc['figure.subplot.right'] - rc['figure.subplot.left'])
+    alto = TAMANO_ENJAMBRE[1] * 72 * (rc['figure.subplot.top'] - rc['figure.subplot.bottom'])
+    return ancho, alto
+
+
+def limites_x(valores):
+    # Mismos límites que daría el autoescalado de matplotlib (márgenes del 5 %)
+    xmin = np.nanmin(valores, axis=0).astype(np.float64)
+    xmax = np.nanmax(valores, axis=0).astype(np.float64)
+    rango = np.where(xmax > xmin, xmax - xmin, 1.0)
+    margen = matplotlib.rcParams['axes.xmargin'] * rango
+    return xmin - margen, xmax + margen
+
+
+def calcular_beeswarm(valores, semiancho=0.4):
+    # Beeswarm por cubos para todas las métricas a la vez. `valores` es una
+    # matriz (jugadores x métricas); cada columna se reparte en cubos del ancho
+    # de un punto y, dentro de cada cubo, los puntos se apilan alternando
+    # arriba/abajo (0, +1, -1, +2, ...). Si un cubo no cabe en el ancho de la
+    # categoría se comprime en vez de descartar puntos como hace seaborn.
+    # Coste O(n log n) por la ordenación, sin bucles en Python.
+    valores = np.asarray(valores, dtype=np.float64)
+    n = valores.shape[0]
+    xmin, xmax = limites_x(valores)
+    ancho_pt, alto_pt = _caja_ejes_pt()
+    paso_x = TAMANO_PUNTO * (xmax - xmin) / ancho_pt
+    paso_y = TAMANO_PUNTO * (2 * 0.5) / alto_pt  # los ejes y van de -0.5 a 0.5
+
+    cubos = np.floor((valores - xmin) / paso_x).astype(np.int64)
+    orden = np.argsort(valores, axis=0, kind='stable')
+    cubos = np.take_along_axis(cubos, orden, axis=0)
+
+    posiciones = np.broadcast_to(np.arange(n)[:, None], cubos.shape)
+    nuevo = np.ones(cubos.shape, dtype=bool)
+    nuevo[1:] = cubos[1:] != cubos[:-1]
+    ultimo = np.ones(cubos.shape, dtype=bool)
+    ultimo[:-1] = nuevo[1:]
+    inicio = np.maximum.accumulate(np.where(nuevo, posiciones, 0), axis=0)
+    fin = np.minimum.accumulate(np.where(ultimo, posiciones, n - 1)[::-1], axis=0)[::-1]
+
+    rango = posiciones - inicio
+    hueco = (rango + 1) // 2 * np.where(rango % 2 == 1, 1, -1)
+    max_hueco = np.maximum((fin - inicio + 1) // 2, 1)
+    paso = np.minimum(paso_y, semiancho / max_hueco)
+
+    y = np.empty_like(valores)
+    np.put_along_axis(y, orden, hueco * paso, axis=0)
+    return y, xmin, xmax
+
+
+def coordenadas_enjambre(clave, valores_comparables):
+    with _coordenadas_lock:
+        coordenadas = _coordenadas.get(clave)
+    if coordenadas is None:
+        coordenadas = calcular_beeswarm(valores_comparables)
+        with _coordenadas_lock:
+            _coordenadas[clave] = coordenadas
+    return coordenadas
+
+
+def renderizar_enjambre(valores, theta, dpi, y=None, xlim=None):
+    # Enjambre de una métrica rasterizado en memoria (RGBA), sin pasar por disco.
+    # Se usa Figure + FigureCanvasAgg en lugar de pyplot para no depender del
+    # estado global de pyplot, que se comparte entre las sesiones de Streamlit.
+    # Con `y` (coordenadas de calcular_beeswarm) se dibuja un scatter; sin ellas
+    # se recurre a sns.swarmplot.
+    fig_save = Figure(figsize=TAMANO_ENJAMBRE, dpi=dpi)
+    canvas = FigureCanvasAgg(fig_save)
+    ax_save = fig_save.subplots()
+    fig_save.set_facecolor(COLOR_FONDO)
+    path_eff = [path_effects.Stroke(linewidth=2, foreground=COLOR_FONDO), path_effects.Normal()]
+    if y is None:
+        sns.swarmplot(x=valores, y=[""]*len(valores), color='grey', edgecolor='w',
+                      s=TAMANO_PUNTO, zorder=1, ax=ax_save)
+    else:
+        ax_save.scatter(valores, y, s=TAMANO_PUNTO**2, color='grey', edgecolor='w',
+                        linewidth=0, zorder=1)
+        ax_save.set_xlim(*xlim)
+        ax_save.set_ylim(0.5, -0.5)
+        ax_save.set_yticks([0], [""])
+    ax_save.patch.set_alpha(0)
+    ax_save.spines['bottom'].set_position(('axes', 0.5))
+    ax_save.spines['bottom'].set_color('w')
+    ax_save.spines['top'].set_color(None)
+    ax_save.spines['right'].set_color('w')
+    ax_save.spines['left'].set_color(None)
+    ax_save.set_xlabel("")
+    ax_save.tick_params(left=False, bottom=True, axis='both', labelsize=8, zorder=10, pad=0, colors='w')
+    rotacion = 0 if theta < np.pi/2 or theta > 3*np.pi/2 else 180
+    for etiqueta in ax_save.get_xticklabels():
+        etiqueta.set_path_effects(path_eff)
+        etiqueta.set_fontweight('bold')
+        etiqueta.set_rotation(rotacion)
+    xlim = ax_save.get_xlim()
+    canvas.draw()
+    return np.asarray(canvas.buffer_rgba()).copy(), xlim
+
+
+def _tarea_enjambre(args):
+    valores, theta, dpi, y, xlim = args
+    return renderizar_enjambre(valores, theta, dpi, y=y, xlim=xlim)
+
+
+def _obtener_pool(workers):
+    # Un pool por número de procesos, creado la primera vez que se usa. Se usa
+    # 'spawn' porque hacer fork de un servidor Streamlit con hilos no es seguro.
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _pools[workers] = pool
+        return pool
+
+
+def _descartar_pool(workers):
+    with _pools_lock:
+        pool = _pools.pop(workers, None)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def renderizar_enjambres(valores_comparables, theta_mid, dpi, coordenadas=None, workers=None, metricas=None):
+    # Rasteriza el enjambre de cada métrica; con varios workers cada métrica va
+    # a un proceso y aquí solo se recogen las imágenes. Si el pool falla se
+    # vuelve a renderizar en serie.
+    workers = RADAR_WORKERS if workers is None else workers
+    tareas = []
+    for idx in range(valores_comparables.shape[1]):
+        y = xlim = None
+        if coordenadas is not None:
+            y_todas, xmins, xmaxs = coordenadas
+            y, xlim = y_todas[:, idx], (xmins[idx], xmaxs[idx])
+        tareas.append((np.asarray(valores_comparables[:, idx]), theta_mid[idx], dpi, y, xlim))
+
+    if workers > 1 and len(tareas) > 1:
+        try:
+            with tramo('enjambres_paralelo', detalle=f"{len(tareas)} métricas"):
+                return list(_obtener_pool(workers).map(_tarea_enjambre, tareas))
+        except (BrokenProcessPool, OSError):
+            _descartar_pool(workers)
+
+    enjambres = []
+    for idx, tarea in enumerate(tareas):
+        with tramo('enjambre', detalle=metricas[idx] if metricas is not None else idx):
+            enjambres.append(_tarea_enjambre(tarea))
+    return enjambres
+
+
+@tramo('renderizar_fondo')
+def renderizar_fondo(metricas, valores_comparables, posicion, nombres_visuales, dpi=DPI_RADAR,
+                     coordenadas=None, motor=MOTOR_ENJAMBRE, workers=None, fuente=FUENTE_DATOS):
+    theta_mid, x_base, y_base = _angulos(len(metricas))
+    if motor == 'numpy' and coordenadas is None:
+        coordenadas = calcular_beeswarm(valores_comparables)
+
+    fig = Figure(constrained_layout=False, figsize=TAMANO_FIGURA, dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    fig.set_facecolor(COLOR_FONDO)
+    theta = np.arange(0, 2*np.pi, 0.01)
+    radar_ax = fig.add_axes([0.025, 0, 0.95, 0.95], polar=True)
+    radar_ax.axis('off')
+
+    for r in [0.17, 0.3425, 0.5150, 0.6875, 0.86]:
+        radar_ax.plot(theta, theta*0 + r, color='grey', lw=1, alpha=0.3)
+
+    ax_mins, ax_maxs = [], []
+    enjambres = renderizar_enjambres(valores_comparables, theta_mid, dpi * ESCALA_ENJAMBRE,
+                                     coordenadas=coordenadas if motor == 'numpy' else None, workers=workers,
+                                     metricas=metricas)
+
+    for idx, metric in enumerate(metricas):
+        imagen_enjambre, xlim = enjambres[idx]
+        ax_mins.append(xlim[0])
+        ax_maxs.append(xlim[1]*1.05)
+        t = Affine2D().scale(3, 1).rotate_deg(theta_mid[idx]*(180/np.pi))
+        h = GridHelperCurveLinear(t, (0, 1, 0, 1))
+        ax = floating_axes.FloatingSubplot(fig, 111, grid_helper=h)
+        ax = fig.add_subplot(ax)
+        aux_ax = ax.get_aux_axes(t)
+        ax_div = Divider(fig, [x_base[idx], y_base[idx], 0.35, 0.35], [Size.Scaled(1.04)], [Size.Scaled(1)], aspect=True)
+        ax.set_axes_locator(ax_div.new_locator(nx=0, ny=0))
+        aux_ax.imshow(imagen_enjambre, extent=[-0.18, 1.12, -0.15, 1.15])
+        ax.axis('off')
+        radar_ax.text(theta_mid[idx], 0.92, "\n".join(tw.wrap(nombres_visuales.get(metric, metric), 18)), ha="center", va="center", fontweight="bold",
+                      fontsize=10, color='w',
+                      rotation=-90 + (180/np.pi)*theta_mid[idx] if theta_mid[idx] < np.pi else 90 + (180/np.pi)*theta_mid[idx])
+
+    fig.text(0.975, 0.953, f"Posición: {posicion}", fontweight="bold", fontsize=14, color='w', ha='right')
+    fig.text(0.975, 0.935, f"{len(valores_comparables)} comparables", fontweight="regular", fontsize=11, color='w', ha='right')
+    fig.text(0.5, 0.02, f"Visualización comparativa | Datos: {fuente}", fontstyle="italic", ha="center", fontsize=9, color="white")
+
+    canvas.draw()
+    imagen = np.asarray(canvas.buffer_rgba()).copy()
+    return Fondo(imagen, ax_mins, ax_maxs)
+
+
+def etiquetas_metricas(metricas, nombres_visuales):
+    # Textos que se dibujan en el fondo para cada métrica: forman parte de las
+    # claves de caché, para que editar metricas_nombres.xlsx invalide los radares
+    return tuple(nombres_visuales.get(metrica, metrica) for metrica in metricas)
+
+
+def obtener_fondo(posicion, partidos_min, version, metricas, valores_comparables, nombres_visuales, dpi=DPI_RADAR,
+                  workers=None, fuente=FUENTE_DATOS):
+    # El fondo no depende del jugador: se renderiza una vez por
+    # (posición, partidos mínimos, versión de los datos, etiquetas, fuente, dpi) y se reutiliza
+    clave = (posicion, partidos_min, version, etiquetas_metricas(metricas, nombres_visuales), fuente, dpi)
+    with _fondos_lock:
+        fondo = _fondos.get(clave)
+    if fondo is None:
+        coordenadas = None
+        if MOTOR_ENJAMBRE == 'numpy':
+            coordenadas = coordenadas_enjambre(clave[:3], valores_comparables)
+        fondo = renderizar_fondo(metricas, valores_comparables, posicion, nombres_visuales, dpi=dpi,
+                                 coordenadas=coordenadas, workers=workers, fuente=fuente)
+        with _fondos_lock:
+            _fondos[clave] = fondo
+    return fondo
+
+
+@tramo('componer_radar')
+def componer_radar(fondo, metricas, valores_jugador, ficha, dpi=DPI_PANTALLA):
+    # Figura final: el fondo cacheado ocupa toda la figura y encima solo se
+    # dibujan la pizza del jugador y su cabecera
+    fig = Figure(constrained_layout=False, figsize=TAMANO_FIGURA, dpi=dpi)
+    FigureCanvasAgg(fig)
+    fig.set_facecolor(COLOR_FONDO)
+    fondo_ax = fig.add_axes([0, 0, 1, 1])
+    fondo_ax.imshow(fondo.imagen, aspect='auto', interpolation='none')
+    fondo_ax.axis('off')
+
+    pizza_ax = fig.add_axes([0.09, 0.065, 0.82, 0.82], polar=True)
+    pizza_ax.set_theta_offset(17)
+    pizza_ax.axis('off')
+
+    radar_object = PyPizza(
+        params=metricas,
+        background_color="w",
+        straight_line_color="w",
+        min_range=fondo.ax_mins,
+        max_range=fondo.ax_maxs,
+        straight_line_lw=1,
+        straight_line_limit=100,
+        last_circle_lw=0.1,
+        other_circle_lw=0.1,
+        inner_circle_size=18
+    )
+
+    radar_object.make_pizza(
+        values=np.asarray(valores_jugador).tolist(),
+        color_blank_space='same',
+        blank_alpha=0,
+        bottom=5,
+        kwargs_params=dict(fontsize=0, color='None'),
+        kwargs_values=dict(fontsize=0, color='None'),
+        kwargs_compare_values=dict(fontsize=0, color='None'),
+        kwargs_slices=dict(
+            facecolor='lightskyblue', alpha=0.3, edgecolor=COLOR_FONDO, linewidth=1, zorder=1),
+        ax=pizza_ax
+    )
+
+    fig.text(0.11, 0.953, ficha['Player'], fontweight="bold", fontsize=14, color='lightskyblue')
+    fig.text(0.11, 0.931, ficha['Squad'], fontweight="bold", fontsize=12, color='w')
+    fig.text(0.11, 0.909, ficha['Competicion'], fontweight="bold", fontsize=12, color='w')
+    return fig
+
+
+def vista_previa(fig, formato='WEBP', calidad=85):
+    # Rasteriza la figura una sola vez a su propio dpi (el de pantalla) y la
+    # comprime en un formato ligero para mostrarla con st.image
+    with tramo(f"codificar_{formato.lower()}"):
+        fig.canvas.draw()
+        imagen = Image.fromarray(np.asarray(fig.canvas.buffer_rgba())).convert('RGB')
+        buffer = io.BytesIO()
+        imagen.save(buffer, format=formato, quality=calidad)
+        return buffer.getvalue()
+
+
+def exportar_figura(fig, formato='png', dpi=DPI_RADAR):
+    # PNG o PDF en memoria, sin escribir en output/
+    with tramo(f"codificar_{formato}"):
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=formato, dpi=dpi, facecolor=fig.get_facecolor())
+        return buffer.getvalue()
+
+
+def generar_radar(ficha, partidos_min, version, metricas, valores_comparables, valores_jugador,
+                  nombres_visuales, formato='webp', dpi=DPI_PANTALLA, fuente=FUENTE_DATOS, almacen=True):
+    # Radar completo en bytes ('webp' para la vista previa o un formato de
+    # FORMATOS_EXPORTACION). Primero se busca en el almacén de artefactos y solo
+    # si no está se pasa por matplotlib. Con almacen=False se dibuja siempre y
+    # no se guarda nada en el almacén.
+    posicion = ficha['Pos']
+    jugador = f"{ficha['Player']}|{ficha['Squad']}|{ficha['Competicion']}"
+    clave = clave_artefacto(jugador, posicion, partidos_min, metricas, version, formato, dpi,
+                            etiquetas=etiquetas_metricas(metricas, nombres_visuales) + (fuente,))
+
+    def generar():
+        fondo = obtener_fondo(posicion, partidos_min, version, metricas, valores_comparables, nombres_visuales, dpi=dpi,
+                              fuente=fuente)
+        fig = componer_radar(fondo, metricas, valores_jugador, ficha, dpi=dpi)
+        if formato == 'webp':
+            return vista_previa(fig)
+        return exportar_figura(fig, formato, dpi=dpi)
+
+    if not almacen:
+        return generar()
+    return obtener_artefacto(clave, formato, generar)
@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+
+# Tabla columnar de partidos: el JSON anidado de api-sports se aplana una sola
+# vez y todos los resúmenes (V/E/D, goles, por año, cara a cara) se calculan
+# con operaciones agrupadas sobre columnas en lugar de bucles por partido.
+COLUMNAS = ['fixture_id', 'fecha', 'temporada', 'competicion', 'local_id', 'visitante_id',
+            'local', 'visitante', 'goles_local', 'goles_visitante', 'estado']
+
+
+def normalizar_partidos(partidos, temporada=None):
+    # `temporada` se usa cuando el propio partido no la trae en league.season
+    filas = [
+        (
+            p['fixture'].get('id'),
+            p['fixture']['date'],
+            p['league'].get('season', temporada),
+            p['league'].get('name'),
+            p['teams']['home']['id'],
+            p['teams']['away']['id'],
+            p['teams']['home']['name'],
+            p['teams']['away']['name'],
+            p['goals']['home'],
+            p['goals']['away'],
+            p['fixture'].get('status', {}).get('short'),
+        )
+        for p in partidos
+    ]
+    df = pd.DataFrame.from_records(filas, columns=COLUMNAS)
+    return df.astype({
+        'fixture_id': 'Int64',
+        'temporada': 'Int16',
+        'competicion': 'category',
+        'local_id': 'int32',
+        'visitante_id': 'int32',
+        'local': 'category',
+        'visitante': 'category',
+        'goles_local': 'Int16',
+        'goles_visitante': 'Int16',
+        'estado': 'category',
+    }).assign(fecha=lambda d: pd.to_datetime(d['fecha'].str[:10], format='%Y-%m-%d'))
+
+
+def concatenar(tablas):
+    tablas = [t for t in tablas if len(t)]
+    if not tablas:
+        return normalizar_partidos([])
+    # Al concatenar, las categorías que no coinciden pasan a object: se restauran
+    df = pd.concat(tablas, ignore_index=True)
+    return df.astype({col: 'category' for col in ('competicion', 'local', 'visitante', 'estado')})
+
+
+def jugados(tabla):
+    # Partidos con marcador (los no disputados tienen los goles a nulo)
+    return tabla[tabla['goles_local'].notna() & tabla['goles_visitante'].notna()]
+
+
+def desde_equipo(tabla, team_id):
+    # Vista de los partidos jugados por el equipo con goles a favor/en contra y
+    # resultado desde su punto de vista
+    tabla = jugados(tabla)
+    tabla = tabla[(tabla['local_id'] == team_id) | (tabla['visitante_id'] == team_id)]
+    es_local = (tabla['local_id'] == team_id).to_numpy()
+    gl = tabla['goles_local'].to_numpy(dtype=np.int64)
+    gv = tabla['goles_visitante'].to_numpy(dtype=np.int64)
+    gf = np.where(es_local, gl, gv)
+    gc = np.where(es_local, gv, gl)
+    return tabla.assign(
+        es_local=es_local,
+        gf=gf,
+        gc=gc,
+        resultado=np.select([gf > gc, gf == gc], ['V', 'E'], 'D'),
+    )
+
+
+def _balance(vista, claves):
+    gf, gc = vista['gf'], vista['gc']
+    return (
+        vista.assign(V=(gf > gc).astype(int), E=(gf == gc).astype(int), D=(gf < gc).astype(int), GF=gf, GC=gc)
+        .groupby(claves, observed=True)[['V', 'E', 'D', 'GF', 'GC']].sum()
+    )
+
+
+def resumen_por_temporada(tabla, team_id):
+    # Una fila por temporada (de la más reciente a la más antigua) con V, E, D, GF y GC
+    resumen = _balance(desde_equipo(tabla, team_id), 'temporada').sort_index(ascending=False)
+    resumen.index = resumen.index.astype(int)
+    return resumen.rename_axis('Año').reset_index()
+
+
+def resumen_equipos(tabla):
+    # Balance por equipo y temporada de todos los equipos de la tabla a la vez:
+    # cada partido aporta una fila como local y otra como visitante
+    tabla = jugados(tabla)
+    gl = tabla['goles_local'].to_numpy(dtype=np.int64)
+    gv = tabla['goles_visitante'].to_numpy(dtype=np.int64)
+    temporada = tabla['temporada'].to_numpy()
+    vista = pd.DataFrame({
+        'equipo_id': np.concatenate([tabla['local_id'].to_numpy(), tabla['visitante_id'].to_numpy()]),
+        'temporada': np.concatenate([temporada, temporada]),
+        'gf': np.concatenate([gl, gv]),
+        'gc': np.concatenate([gv, gl]),
+    })
+    return _balance(vista, ['equipo_id', 'temporada'])
+
+
+def resumen_enfrentamientos(tabla, equipo1, equipo2):
+    # Balance cara a cara entre dos equipos (por nombre, como en calcular_resumen)
+    tabla = jugados(tabla)
+    gl = tabla['goles_local'].to_numpy(dtype=np.int64)
+    gv = tabla['goles_visitante'].to_numpy(dtype=np.int64)
+    uno_local = (tabla['local'] == equipo1).to_numpy()
+    uno_visitante = (tabla['visitante'] == equipo1).to_numpy()
+
+    empates = gl == gv
+    gana_uno = ~empates & ((uno_local & (gl > gv)) | (uno_visitante & (gv > gl)))
+    gana_dos = ~empates & ~gana_uno
+    gf_uno = int(np.where(uno_local, gl, gv).sum())
+    gc_uno = int(np.where(uno_local, gv, gl).sum())
+
+    return {
+        equipo1: {'victorias': int(gana_uno.sum()), 'empates': int(empates.sum()), 'derrotas': int(gana_dos.sum()),
+                  'goles_favor': gf_uno, 'goles_contra': gc_uno},
+        equipo2: {'victorias': int(gana_dos.sum()), 'empates': int(empates.sum()), 'derrotas': int(gana_uno.sum()),
+                  'goles_favor': gc_uno, 'goles_contra': gf_uno},
+    }
+
+
+def tabla_resultados(tabla):
+    # Tabla de partidos para mostrar, con el resultado ya coloreado en HTML
+    tabla = jugados(tabla).sort_values(['temporada', 'fecha'], ascending=False, kind='stable')
+    gl = tabla['goles_local'].to_numpy(dtype=np.int64)
+    gv = tabla['goles_visitante'].to_numpy(dtype=np.int64)
+    resultado = np.select(
+        [gl > gv, gl == gv],
+        ["<span style='color:green;'>V</span>", "<span style='color:orange;'>E</span>"],
+        "<span style='color:red;'>D</span>",
+    )
+    partido = (tabla['local'].astype(str) + ' ' + tabla['goles_local'].astype(str) + ' - '
+               + tabla['goles_visitante'].astype(str) + ' ' + tabla['visitante'].astype(str))
+    return pd.DataFrame({
+        'Fecha': tabla['fecha'].dt.strftime('%Y-%m-%d').to_numpy(),
+        'Competición': tabla['competicion'].astype(str).to_numpy(),
+        'Resultado': resultado,
+        'Partido': partido.to_numpy(),
+    })
@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+import time
+
+from utils.api_utils import get_league_seasons, get_teams_by_league
+
+# Última temporada con equipos de cada liga y su mapa nombre -> id. Se guarda
+# en disco para que tras reiniciar la app elegir liga siga sin llamar a la API.
+RUTA_TEMPORADAS = os.path.join(os.path.dirname(__file__), '..', 'data', '.cache', 'temporadas_ligas.json')
+
+# Cada cuánto se vuelven a resolver en segundo plano las ligas conocidas
+INTERVALO_REFRESCO = float(os.environ.get('API_SPORTS_REFRESCO_TEMPORADAS', str(6 * 3600)))
+
+_resueltas = None
+_lock = threading.Lock()
+_refresco = None
+
+
+def _cargar():
+    global _resueltas
+    if _resueltas is None:
+        try:
+            with open(RUTA_TEMPORADAS, encoding='utf-8') as f:
+                _resueltas = {int(liga): datos for liga, datos in json.load(f).items()}
+        except (FileNotFoundError, ValueError):
+            _resueltas = {}
+    return _resueltas
+
+
+def _guardar():
+    os.makedirs(os.path.dirname(RUTA_TEMPORADAS), exist_ok=True)
+    temporal = f"{RUTA_TEMPORADAS}.{os.getpid()}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(_resueltas, f, ensure_ascii=False)
+    os.replace(temporal, RUTA_TEMPORADAS)
+
+
+def buscar_temporada(api_key, league_id, forzar=False):
+    # Recorre las temporadas de la más reciente a la más antigua hasta dar con
+    # una que ya tenga equipos (la última listada puede estar aún vacía)
+    for temporada in get_league_seasons(api_key, league_id, limit=None, forzar=forzar):
+        equipos = get_teams_by_league(api_key, league_id, temporada, forzar=forzar)
+        if equipos:
+            return temporada, equipos
+    return None, {}
+
+
+def refrescar_liga(api_key, league_id, forzar=False):
+    # `forzar` salta la caché HTTP: sin él, ligas (7 días) y equipos (1 día,
+    # incluidas las temporadas aún vacías) no se volverían a preguntar antes
+    # de que caduquen, por frecuente que sea el refresco
+    temporada, equipos = buscar_temporada(api_key, league_id, forzar=forzar)
+    if not equipos:
+        # Un fallo puntual de la API no borra lo que ya se conocía
+        return resolver_guardada(league_id)
+    with _lock:
+        _cargar()[int(league_id)] = {'temporada': temporada, 'equipos': equipos, 'actualizado': time.time()}
+        _guardar()
+    return temporada, equipos
+
+
+def resolver_guardada(league_id):
+    with _lock:
+        datos = _cargar().get(int(league_id))
+    if datos is None:
+        return None, {}
+    return datos['temporada'], datos['equipos']
+
+
+def resolver_temporada(api_key, league_id):
+    # Lo memorizado se devuelve sin llamar a la API; solo una liga que no se
+    # ha resuelto nunca se resuelve en la propia petición
+    temporada, equipos = resolver_guardada(league_id)
+    if equipos:
+        return temporada, equipos
+    return refrescar_liga(api_key, league_id)
+
+
+def _caducada(league_id, intervalo):
+    with _lock:
+        datos = _cargar().get(int(league_id))
+    return datos is None or time.time() - datos['actualizado'] >= intervalo
+
+
+def _bucle_refresco(api_key, ligas, intervalo, parar):
+    while True:
+        for league_id in ligas:
+            if parar.is_set():
+                return
+            if not _caducada(league_id, intervalo):
+                continue
+            try:
+                refrescar_liga(api_key, league_id, forzar=True)
+            except Exception:
+                # Sin red o con la API caída se reintenta en la siguiente vuelta
+                pass
+        if parar.wait(intervalo):
+            return
+
+
+def iniciar_refresco(api_key, ligas, intervalo=INTERVALO_REFRESCO):
+    # Hilo único por proceso que mantiene al día las ligas indicadas: en cada
+    # vuelta resuelve las que no se conocen o llevan más de `intervalo` sin revisar
+    global _refresco
+    with _lock:
+        if _refresco is not None and _refresco[0].is_alive():
+            return _refresco[1]
+        parar = threading.Event()
+        hilo = threading.Thread(target=_bucle_refresco, args=(api_key, list(ligas), intervalo, parar),
+                                name='refresco-temporadas', daemon=True)
+        hilo.start()
+        _refresco = (hilo, parar)
+        return parar